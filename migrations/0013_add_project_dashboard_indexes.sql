@@ -0,0 +1,8 @@
+-- Migration 0013: Indexes for the projects dashboard query
+-- The dashboard loads a user's projects through project_users and joins the newest video of each project
+
+-- Membership lookup by user, covering the join to projects
+CREATE INDEX IF NOT EXISTS idx_project_users_user_project ON project_users(user_id, project_id);
+
+-- Newest video per project (lateral lookup WHERE project_id = ? AND file_type = 'video' ORDER BY created_at DESC LIMIT 1)
+CREATE INDEX IF NOT EXISTS idx_files_project_latest_video ON files(project_id, created_at DESC) WHERE file_type = 'video';
@@ -0,0 +1,12 @@
+-- Migration 0014: Indexes on foreign keys used as filters by list and lookup endpoints
+-- Postgres does not index foreign key columns automatically, so these lookups were sequential scans
+-- (comments_unified(user_id) and files(uploaded_by_id) are already indexed by the Docker schema setup)
+
+-- Approvals by a user (approvals by file and user are covered by the unique index in 0015)
+CREATE INDEX IF NOT EXISTS idx_approvals_user_id ON approvals(user_id);
+
+-- Replies of a legacy comment
+CREATE INDEX IF NOT EXISTS idx_comments_parent_id ON comments(parent_id);
+
+-- Pending invitations of a project
+CREATE INDEX IF NOT EXISTS idx_invitations_project_id ON invitations(project_id);
@@ -0,0 +1,15 @@
+-- Migration 0015: One approval per user and file
+-- Approvals are written with INSERT ... ON CONFLICT (file_id, user_id), which requires a unique index
+
+-- Keep only the most recent approval for each user and file
+DELETE FROM approvals a
+USING approvals newer
+WHERE a.file_id = newer.file_id
+  AND a.user_id = newer.user_id
+  AND (a.created_at, a.id) < (newer.created_at, newer.id);
+
+-- Also declared on the approvals table in shared/schema.ts so db:push creates it too
+CREATE UNIQUE INDEX IF NOT EXISTS idx_approvals_file_user_unique ON approvals(file_id, user_id);
+
+-- Databases that applied an earlier revision of 0014 have a redundant plain index on these columns
+DROP INDEX IF EXISTS idx_approvals_file_user;
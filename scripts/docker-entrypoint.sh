@@ -11,9 +11,15 @@ echo "Waiting for database to be ready..."
   exit 1
 }
 
-# Create comments_unified table safely if it doesn't exist
-echo "Ensuring unified comment system table exists..."
-psql $DATABASE_URL -c "
+# Create comments_unified table safely if it doesn't exist. The block is only run when the
+# table is missing, so an existing install does one catalog lookup per boot instead of
+# re-checking every constraint and index
+comments_unified_exists=$(psql $DATABASE_URL -tAc "SELECT to_regclass('public.comments_unified') IS NOT NULL" 2>/dev/null || echo "f")
+if [ "$comments_unified_exists" = "t" ]; then
+  echo "Unified comment system table already exists, skipping creation"
+else
+  echo "Ensuring unified comment system table exists..."
+  psql $DATABASE_URL -c "
 CREATE TABLE IF NOT EXISTS comments_unified (
     id TEXT PRIMARY KEY DEFAULT gen_random_uuid(),
     file_id INTEGER NOT NULL,
@@ -47,43 +53,79 @@ END \$\$;
 CREATE INDEX IF NOT EXISTS idx_comments_unified_file_id ON comments_unified(file_id);
 CREATE INDEX IF NOT EXISTS idx_comments_unified_user_id ON comments_unified(user_id);
 CREATE INDEX IF NOT EXISTS idx_comments_unified_parent_id ON comments_unified(parent_id);
-" || {
-  echo "Warning: Could not create comments_unified table. Attempting to continue..."
-}
+  " || {
+    echo "Warning: Could not create comments_unified table. Attempting to continue..."
+  }
+fi
 
 # Run migrations with error handling
 echo "Running database migrations..."
 run_migrations() {
-  local success=0
-  
-  if [ -f "/app/server/db-migrate.cjs" ]; then
-    echo "Found db-migrate.cjs, running migrations..."
-    node /app/server/db-migrate.cjs || success=1
-  elif [ -f "/app/server/db-migrate.js" ]; then
-    echo "Found db-migrate.js, running migrations..."
-    node /app/server/db-migrate.js || success=1
-  else
-    echo "Migration file not found. Checking for alternate locations..."
-    success=1
-  fi
-  
+  # server/db-migrate.cjs is not run here: it only re-checks the connection that
+  # wait-for-db.sh has already verified. Run it manually when diagnosing connectivity.
+
   # Apply any SQL migrations directly if they exist
   if [ -d "/app/migrations" ]; then
     echo "Found SQL migrations directory, applying SQL migrations..."
+    # Parse DATABASE_URL to extract credentials
+    DB_HOST=$(echo $DATABASE_URL | sed -E 's/.*@([^:]+)(:[0-9]+)?\/.*/\1/')
+    DB_PORT=$(echo $DATABASE_URL | sed -E 's/.*:([0-9]+)\/.*/\1/')
+    DB_NAME=$(echo $DATABASE_URL | sed -E 's/.*\/([^?]+).*/\1/')
+    DB_USER=$(echo $DATABASE_URL | sed -E 's/.*:\/\/([^:]+):.*/\1/')
+    DB_PASS=$(echo $DATABASE_URL | sed -E 's/.*:\/\/[^:]+:([^@]+).*/\1/')
+
+    PSQL="psql -h $DB_HOST -p $DB_PORT -U $DB_USER -d $DB_NAME"
+    export PGPASSWORD=$DB_PASS
+
+    # Databases that predate migration tracking already had every migration up to 0012 applied
+    # (with errors tolerated) on each boot. On the first tracked boot those migrations are replayed
+    # once in that tolerant mode and recorded; later migrations, and every migration from then on,
+    # must apply cleanly.
+    last_legacy_migration=0012
+    legacy_baseline=$($PSQL -tAc "SELECT to_regclass('public.schema_migrations') IS NULL AND to_regclass('public.users') IS NOT NULL") || {
+      echo "Error: Could not inspect the database before applying migrations."
+      exit 1
+    }
+
+    # Applied migrations are recorded so later boots skip them instead of re-running every file
+    $PSQL -q -v ON_ERROR_STOP=1 -c "
+      CREATE TABLE IF NOT EXISTS schema_migrations (
+        filename TEXT PRIMARY KEY,
+        applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+      );" || {
+      echo "Error: Could not create the schema_migrations table."
+      exit 1
+    }
+    applied_migrations=$($PSQL -tAc "SELECT filename FROM schema_migrations") || {
+      echo "Error: Could not read applied migrations."
+      exit 1
+    }
+
     for migration in /app/migrations/*.sql; do
       if [ -f "$migration" ]; then
+        migration_name=$(basename "$migration")
+        if echo "$applied_migrations" | grep -qx "$migration_name"; then
+          continue
+        fi
+
+        record_sql="INSERT INTO schema_migrations (filename) VALUES ('$migration_name') ON CONFLICT DO NOTHING;"
+
+        if [ "$legacy_baseline" = "t" ] && [ "${migration_name%%_*}" -le "$last_legacy_migration" ]; then
+          echo "Recording previously applied SQL migration: $migration"
+          $PSQL -q -f "$migration" || true
+          $PSQL -q -v ON_ERROR_STOP=1 -c "$record_sql" || {
+            echo "Error: Could not record SQL migration $migration."
+            exit 1
+          }
+          continue
+        fi
+
         echo "Applying SQL migration: $migration"
-        # Parse DATABASE_URL to extract credentials
-        DB_HOST=$(echo $DATABASE_URL | sed -E 's/.*@([^:]+)(:[0-9]+)?\/.*/\1/')
-        DB_PORT=$(echo $DATABASE_URL | sed -E 's/.*:([0-9]+)\/.*/\1/')
-        DB_NAME=$(echo $DATABASE_URL | sed -E 's/.*\/([^?]+).*/\1/')
-        DB_USER=$(echo $DATABASE_URL | sed -E 's/.*:\/\/([^:]+):.*/\1/')
-        DB_PASS=$(echo $DATABASE_URL | sed -E 's/.*:\/\/[^:]+:([^@]+).*/\1/')
-        
-        # Execute the SQL file using psql
-        PGPASSWORD=$DB_PASS psql -h $DB_HOST -p $DB_PORT -U $DB_USER -d $DB_NAME -f $migration || {
-          echo "Warning: SQL migration $migration encountered issues."
-          echo "This might be normal if the changes already exist. Continuing..."
+        # The migration and its record are applied in one transaction that stops at the first
+        # error, so a migration is either fully applied and recorded or not applied at all
+        $PSQL -v ON_ERROR_STOP=1 --single-transaction -f "$migration" -c "$record_sql" || {
+          echo "Error: SQL migration $migration failed and was rolled back. Refusing to start."
+          exit 1
         }
       fi
     done
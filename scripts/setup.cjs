@@ -44,11 +44,8 @@ async function main() {
   const pool = new Pool({ connectionString: DATABASE_URL });
   
   try {
-    // Check if admin user already exists
-    const existingUserResult = await pool.query(
-      'SELECT * FROM users WHERE username = $1 OR email = $2',
-      [ADMIN_USERNAME, ADMIN_EMAIL]
-    );
+    // Cheap probe first so the (deliberately slow) password hash only runs when the admin is missing
+    const existingUserResult = await pool.query('SELECT 1 FROM users WHERE username = $1', [ADMIN_USERNAME]);
     
     if (existingUserResult.rows.length > 0) {
       console.log('Admin user already exists, skipping creation');
@@ -58,14 +55,22 @@ async function main() {
     // Hash the password
     const hashedPassword = await hashPassword(ADMIN_PASSWORD);
     
-    // Create admin user
-    console.log(`Creating admin user: ${ADMIN_USERNAME}`);
-    await pool.query(
-      'INSERT INTO users (username, password, email, name, role, "createdAt") VALUES ($1, $2, $3, $4, $5, NOW())',
+    // A conflict on the unique username or email means another process created the user
+    // (or the email is taken) since the probe
+    const result = await pool.query(
+      `INSERT INTO users (username, password, email, name, role, created_at)
+       VALUES ($1, $2, $3, $4, $5, NOW())
+       ON CONFLICT DO NOTHING
+       RETURNING id`,
       [ADMIN_USERNAME, hashedPassword, ADMIN_EMAIL, ADMIN_NAME, 'admin']
     );
     
-    console.log('Admin user created successfully');
+    if (result.rows.length === 0) {
+      console.log('Admin user already exists, skipping creation');
+      return;
+    }
+    
+    console.log(`Admin user created successfully: ${ADMIN_USERNAME} (id ${result.rows[0].id})`);
   } catch (error) {
     console.error('Error creating admin user:', error);
     throw error;
@@ -5,9 +5,9 @@ import session from "express-session";
 import { scrypt, randomBytes, timingSafeEqual } from "crypto";
 import { promisify } from "util";
 import { storage } from "./storage";
-import { User as SelectUser, InsertUser } from "@shared/schema";
-import crypto from "crypto";
-import { pool, db } from "./db";
+import { User as SelectUser } from "@shared/schema";
+import { sharedPool } from "./db";
+import { config, getEnv } from "./utils/config";
 import connectPg from "connect-pg-simple";
 
 declare global {
@@ -32,22 +32,30 @@ export async function comparePasswords(supplied: string, stored: string) {
 }
 
 export function generateToken(length = 32): string {
-  return crypto.randomBytes(length).toString('hex');
+  return randomBytes(length).toString('hex');
 }
 
+// Apps that already have session and passport middleware installed
+const authConfiguredApps = new WeakSet<Express>();
+
 export function setupAuth(app: Express) {
-  // Create session store - create dedicated pool for sessions
+  // A second call would stack another session store, passport.session() pass and set of
+  // auth routes onto every request, so repeated setup is a no-op
+  if (authConfiguredApps.has(app)) return;
+  authConfiguredApps.add(app);
+
+  // Create session store on the application's connection pool
   let sessionStore;
   
   try {
     // Use the database connection for session storage
     const PgStore = connectPg(session);
     sessionStore = new PgStore({
-      conString: process.env.DATABASE_URL,
+      pool: sharedPool as any,
       tableName: 'session',
       createTableIfMissing: true
     });
-    console.log('Using PostgreSQL session store with connection string');
+    console.log('Using PostgreSQL session store on the shared connection pool');
   } catch (error) {
     console.error('Failed to create PostgreSQL session store:', error);
     console.log('Falling back to memory session store');
@@ -55,13 +63,13 @@ export function setupAuth(app: Express) {
   }
 
   const sessionSettings: session.SessionOptions = {
-    secret: process.env.SESSION_SECRET || 'obviu-secret',
+    secret: getEnv('SESSION_SECRET') || 'obviu-secret',
     resave: false,
     saveUninitialized: false,
     ...(sessionStore && { store: sessionStore }),
     cookie: {
       httpOnly: true,
-      secure: process.env.NODE_ENV === 'production',
+      secure: config.isProduction,
       maxAge: 30 * 24 * 60 * 60 * 1000, // 30 days
       sameSite: 'lax'
     },
@@ -76,8 +84,9 @@ export function setupAuth(app: Express) {
   passport.use(
     new LocalStrategy(async (username, password, done) => {
       try {
-        const user = await storage.getUserByUsername(username) || 
-                    await storage.getUserByEmail(username);
+        // Users may sign in with either their username or email; a username match wins
+        const candidates = await storage.getUsersByUsernameOrEmail(username, username);
+        const user = candidates.find(candidate => candidate.username === username) || candidates[0];
                     
         if (!user || !(await comparePasswords(password, user.password))) {
           return done(null, false, { message: "Invalid username or password" });
@@ -94,11 +103,10 @@ export function setupAuth(app: Express) {
   
   passport.deserializeUser(async (id: number, done) => {
     try {
-      const user = await storage.getUser(id);
-      // Remove password from user object for security
+      // The password hash is never loaded for the session user
+      const user = await storage.getSafeUser(id);
       if (user) {
-        const { password, ...userWithoutPassword } = user;
-        done(null, userWithoutPassword as any);
+        done(null, user as any);
       } else {
         done(null, null);
       }
@@ -117,13 +125,12 @@ export function setupAuth(app: Express) {
       }
 
       // Check if username or email already exists
-      const existingUsername = await storage.getUserByUsername(username);
-      if (existingUsername) {
+      const existingUsers = await storage.getUsersByUsernameOrEmail(username, email);
+      if (existingUsers.some(user => user.username === username)) {
         return res.status(400).json({ message: "Username already exists" });
       }
       
-      const existingEmail = await storage.getUserByEmail(email);
-      if (existingEmail) {
+      if (existingUsers.some(user => user.email === email)) {
         return res.status(400).json({ message: "Email already exists" });
       }
 
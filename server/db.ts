@@ -1,9 +1,14 @@
 import * as schema from "@shared/schema";
+import { queryCountLogger } from "./utils/query-counter";
+import { config } from "./utils/config";
 
 // Check if we're running in Docker/production environment
-const isDocker = process.env.IS_DOCKER === 'true' || process.env.NODE_ENV === 'production';
+const isDocker = config.isDocker || config.isProduction;
 
-if (!process.env.DATABASE_URL) {
+// In development, count queries per request so N+1 regressions are reported
+const queryLogger = config.isDevelopment ? queryCountLogger : undefined;
+
+if (!config.databaseUrl) {
   throw new Error(
     "DATABASE_URL must be set. Did you forget to provision a database?",
   );
@@ -26,14 +31,17 @@ const initializeDatabase = async () => {
       const { drizzle: pgDrizzle } = await import('drizzle-orm/node-postgres');
       
       pool = new PgPool({ 
-        connectionString: process.env.DATABASE_URL,
+        connectionString: config.databaseUrl,
         // Additional connection parameters for stability
-        max: 20, // maximum number of clients
-        idleTimeoutMillis: 30000, // how long a client is allowed to remain idle before being closed
-        connectionTimeoutMillis: 10000, // how long to wait for a connection to become available
+        max: config.database.poolMax, // maximum number of clients
+        min: config.database.poolMin, // clients kept open while idle
+        idleTimeoutMillis: config.database.idleTimeoutMillis, // how long a client is allowed to remain idle before being closed
+        connectionTimeoutMillis: config.database.connectionTimeoutMillis, // how long to wait for a connection to become available
+        maxLifetimeSeconds: config.database.maxLifetimeSeconds, // recycle clients so stale connections are replaced
+        keepAlive: true, // TCP keepalive so dropped connections are detected instead of failing the next query
       });
       
-      db = pgDrizzle(pool, { schema });
+      db = pgDrizzle(pool, { schema, logger: queryLogger });
     } else {
       // For development, use Neon serverless
       const { Pool: NeonPool, neonConfig } = await import('@neondatabase/serverless');
@@ -42,8 +50,13 @@ const initializeDatabase = async () => {
       
       neonConfig.webSocketConstructor = webSocket.default;
       
-      pool = new NeonPool({ connectionString: process.env.DATABASE_URL });
-      db = neonDrizzle(pool, { schema });
+      pool = new NeonPool({
+        connectionString: config.databaseUrl,
+        max: config.database.poolMax,
+        idleTimeoutMillis: config.database.idleTimeoutMillis,
+        connectionTimeoutMillis: config.database.connectionTimeoutMillis,
+      });
+      db = neonDrizzle(pool, { schema, logger: queryLogger });
     }
     
     // Add error handler to connection pool
@@ -60,11 +73,41 @@ const initializeDatabase = async () => {
 };
 
 // Initialize the database connection immediately
-initializeDatabase().catch(error => {
+const databaseReady = initializeDatabase();
+databaseReady.catch(error => {
   console.error('Database initialization failed:', error);
   process.exit(1); // Exit if we can't connect to the database
 });
 
+// Open the pool's minimum connections up front so the first requests after startup don't each
+// pay for a TCP/TLS handshake and authentication
+async function warmPool(pool: any) {
+  const count = Math.min(config.database.poolMin, config.database.poolMax);
+  if (count <= 0) return;
+
+  const clients = await Promise.all(
+    Array.from({ length: count }, () => pool.connect().catch(() => null))
+  );
+  const opened = clients.filter(Boolean);
+  opened.forEach((client: any) => client.release());
+  console.log(`Database pool warmed with ${opened.length}/${count} connections`);
+}
+
+// Only the Docker/production pool is warmed; in development the Neon pool opens websocket
+// connections on demand and a restart-heavy workflow gains nothing from holding them open.
+// Resolves either way, so callers can wait on it without handling failures.
+const poolWarmed: Promise<void> = isDocker
+  ? databaseReady
+      .then(({ pool }) => warmPool(pool))
+      .catch(error => console.warn('Database pool warm-up failed:', error))
+  : Promise.resolve();
+
+// Pool handle for libraries that are set up before initialization finishes (the session store),
+// so they share the application pool instead of opening their own connections
+const sharedPool = {
+  query: (...args: any[]) => databaseReady.then(({ pool }) => pool.query(...args)),
+};
+
 // Export the pool and db objects
 // These will be initialized asynchronously by the IIFEs above
-export { pool, db };
\ No newline at end of file
+export { pool, db, sharedPool, poolWarmed };
\ No newline at end of file
@@ -1,11 +1,19 @@
 import express, { type Request, Response, NextFunction } from "express";
 import { registerRoutes } from "./routes";
 import { setupVite, serveStatic, log } from "./vite";
+import { trackRequestQueries } from "./utils/query-counter";
+import { config } from "./utils/config";
+import { bodyParsers } from "./utils/body-parsers";
 
 const app = express();
-// Configure Express to handle large files (50GB limit)
-app.use(express.json({ limit: '51200mb' }));
-app.use(express.urlencoded({ extended: false, limit: '51200mb' }));
+// Express defaults to "development" when NODE_ENV is unset; pin it to the configured mode
+app.set("env", config.isDevelopment ? "development" : "production");
+app.use(bodyParsers({ extended: false }));
+
+// Report API requests that issue an excessive number of queries (N+1 detection)
+if (config.isDevelopment) {
+  app.use(trackRequestQueries);
+}
 
 // Increase the HTTP request timeout for large file uploads
 app.use((req, res, next) => {
@@ -13,16 +21,22 @@ app.use((req, res, next) => {
   next();
 });
 
+// Response bodies are only echoed into the request log in development; elsewhere every
+// API payload would be serialized a second time just to be truncated to one log line
+const logResponseBodies = config.isDevelopment;
+
 app.use((req, res, next) => {
   const start = Date.now();
   const path = req.path;
   let capturedJsonResponse: Record<string, any> | undefined = undefined;
 
-  const originalResJson = res.json;
-  res.json = function (bodyJson, ...args) {
-    capturedJsonResponse = bodyJson;
-    return originalResJson.apply(res, [bodyJson, ...args]);
-  };
+  if (logResponseBodies) {
+    const originalResJson = res.json;
+    res.json = function (bodyJson, ...args) {
+      capturedJsonResponse = bodyJson;
+      return originalResJson.apply(res, [bodyJson, ...args]);
+    };
+  }
 
   res.on("finish", () => {
     const duration = Date.now() - start;
@@ -57,7 +71,7 @@ app.use((req, res, next) => {
   // importantly only setup vite in development and after
   // setting up all the other routes so the catch-all route
   // doesn't interfere with the other routes
-  if (app.get("env") === "development") {
+  if (config.isDevelopment) {
     await setupVite(app, server);
   } else {
     serveStatic(app);
@@ -1,25 +1,25 @@
 import express from "express";
 import path from "path";
 import fs from "fs";
-import { setupAuth } from "./auth.js";
 import { registerRoutes } from "./routes.js";
+import { poolWarmed } from "./db.js";
 import { config } from "./utils/config.js";
+import { bodyParsers } from "./utils/body-parsers.js";
+import { staticFileOptions } from "./utils/static-files.js";
 
 const app = express();
+// Use the environment resolved by config at startup rather than Express's own NODE_ENV lookup
+app.set("env", config.isDevelopment ? "development" : "production");
 
 // Middleware
-app.use(express.json({ limit: '51200mb' }));
-app.use(express.urlencoded({ extended: true, limit: '51200mb' }));
-
-// Setup authentication
-setupAuth(app);
+app.use(bodyParsers({ extended: true }));
 
 // Serve static files from the built frontend
 const staticPath = path.resolve(import.meta.dirname, "public");
 
 if (fs.existsSync(staticPath)) {
   console.log("✅ Serving static files from:", staticPath);
-  app.use(express.static(staticPath));
+  app.use(express.static(staticPath, staticFileOptions));
   
   // Fallback to index.html for SPA routing
   app.get('*', (_req, res, next) => {
@@ -39,13 +39,13 @@ if (fs.existsSync(staticPath)) {
   });
 }
 
-// Health check endpoint
-app.get('/api/health', (_req, res) => {
-  res.json({ status: 'ok', timestamp: new Date().toISOString() });
-});
+// Register all routes and start the server. registerRoutes sets up authentication and the
+// /api/health check itself, so neither is repeated here.
+registerRoutes(app).then(async server => {
+  // Accept traffic only once the database pool has its warm connections, so the first
+  // requests after a deploy don't queue behind connection setup
+  await poolWarmed;
 
-// Register all routes and start the server
-registerRoutes(app).then(server => {
   // Start listening on the configured port
   server.listen(config.port, '0.0.0.0', () => {
     console.log(`🚀 Production server running on port ${config.port}`);
@@ -5,11 +5,25 @@ import { setupAuth, generateToken, hashPassword } from "./auth";
 import multer from "multer";
 import type { Multer } from "multer"; // Import multer types
 import path from "path";
-import { z } from "zod";
-import { File as StorageFile } from "@shared/schema";
+import { File as StorageFile, type ProjectUser } from "@shared/schema";
 import * as fileSystem from "./utils/filesystem";
+import { largeBufferDiskStorage, withPathLocks, hasPendingClaim, releaseStoredFile } from "./utils/upload-storage";
+import { videoProcessingQueue, notificationQueue } from "./utils/task-queue";
+import {
+  CHUNKED_UPLOAD_CHUNK_SIZE,
+  CHUNKED_UPLOAD_MIN_CHUNK_SIZE,
+  isAcceptableChunkSize,
+  createChunkedUpload,
+  getChunkedUpload,
+  getContiguousOffset,
+  isChunkedUploadComplete,
+  parseContentRange,
+  writeChunk,
+  completeChunkedUpload,
+  discardChunkedUpload
+} from "./utils/chunked-upload";
+import { config, getEnv } from "./utils/config";
 import * as fs from 'fs';
-import * as fsPromises from 'fs/promises';
 import { existsSync } from 'fs';
 import * as crypto from 'crypto';
 
@@ -32,15 +46,13 @@ interface FileRequest extends Request {
     filename: string;
     path: string;
     size: number;
+    created?: boolean; // Set by the deduplicating storage engine
   };
 }
 import { 
   insertProjectSchema,
   insertFolderSchema,
-  insertCommentSchema,
-  insertPublicCommentSchema,
   insertCommentsUnifiedSchema,
-  insertFileSchema,
   insertProjectUserSchema,
   insertApprovalSchema
 } from "@shared/schema";
@@ -95,26 +107,130 @@ async function processVideoInBackground(file: any, processingId: number) {
   }
 }
 
-// Ensure uploads directory exists
-const uploadsDir = path.join(process.cwd(), 'uploads');
-// Create uploads directory if it doesn't exist
-// Don't use fs.mkdir directly to avoid ES module issues
-try {
-  if (!fs.existsSync(uploadsDir)) {
-    fs.mkdirSync(uploadsDir, { recursive: true });
+// Create the file record for a stored upload, respond to the client, then log the upload and
+// start video processing in the background. Shared by the multipart and chunked upload routes.
+async function registerUploadedFile(
+  req: Request,
+  res: Response,
+  projectId: number,
+  // `created` is set for content-addressed uploads, which hold a claim on the stored file
+  uploaded: { originalname: string; mimetype: string; size: number; path: string; created?: boolean },
+  customFilename?: string
+) {
+  let file: StorageFile;
+  try {
+    file = await createUploadedFileRecord(req, projectId, uploaded, customFilename);
+  } finally {
+    // Once the record exists (or failed to be created) it decides whether the stored file is kept
+    if (uploaded.created !== undefined) {
+      await releaseStoredFile(uploaded.path, isStoredPathReferenced);
+    }
+  }
+
+  // IMMEDIATELY respond to client to prevent timeout
+  res.status(201).json(file);
+
+  // Continue with background operations after response is sent
+  try {
+    // Log activity
+    await storage.logActivity({
+      action: "upload",
+      entityType: "file",
+      entityId: file.id,
+      userId: req.user.id,
+      metadata: { 
+        projectId,
+        filename: file.filename,
+        version: file.version,
+      },
+    });
+
+    // Process video files automatically for better scrubbing performance
+    if (file.fileType === "video") {
+      // Create video processing record
+      const processing = await storage.createVideoProcessing({
+        fileId: file.id,
+        status: "pending"
+      });
+
+      // Queue processing in the background (don't wait for completion)
+      videoProcessingQueue.enqueue(`file ${file.id}`, () => processVideoInBackground(file, processing.id));
+
+      console.log(`[Video Processing] Queued background processing for: ${file.filename}`);
+    }
+  } catch (error) {
+    console.error(`[Upload] Background operations failed for file ${file.id}:`, error);
+    // Don't re-throw since response already sent
   }
+}
+
+// Create the file record for an upload, versioning it against files of the same name
+async function createUploadedFileRecord(
+  req: Request,
+  projectId: number,
+  uploaded: { originalname: string; mimetype: string; size: number; path: string },
+  customFilename?: string
+) {
+  // Use custom filename if provided
+  const filename = customFilename || uploaded.originalname;
+
+  // Determine file type from mimetype
+  let fileType = "other";
+  if (uploaded.mimetype.startsWith("video/")) {
+    fileType = "video";
+  } else if (uploaded.mimetype.startsWith("audio/")) {
+    fileType = "audio";
+  } else if (uploaded.mimetype.startsWith("image/")) {
+    fileType = "image";
+  }
+
+  // Check for existing files to determine version
+  const existingFiles = await storage.getFilesByProject(projectId);
+  const similarFiles = existingFiles.filter(f => f.filename === filename);
+
+  // Determine version number
+  const version = similarFiles.length > 0 
+    ? Math.max(...similarFiles.map(f => f.version)) + 1 
+    : 1;
+
+  // If this is a new version, mark old versions as not latest
+  if (version > 1) {
+    await Promise.all(
+      similarFiles.map(async (file) => {
+        await storage.updateFile(file.id, { isLatestVersion: false });
+      })
+    );
+  }
+
+  // Create file record in storage with custom filename if provided
+  return await storage.createFile({
+    filename: filename, // Use custom filename or original filename
+    fileType,
+    fileSize: uploaded.size,
+    filePath: uploaded.path,
+    projectId,
+    uploadedById: req.user.id,
+    version,
+    isLatestVersion: true
+  });
+}
+
+// Ensure uploads directory exists (created once at startup; a recursive mkdir is a no-op if it exists)
+const uploadsDir = config.uploadDir;
+try {
+  fs.mkdirSync(uploadsDir, { recursive: true });
 } catch (error) {
   console.error(`Error creating uploads directory: ${error}`);
 }
 
-// Configure multer storage
-const storage_config = multer.diskStorage({
-  destination: function (req, file, cb) {
-    cb(null, uploadsDir);
-  },
-  filename: function (req, file, cb) {
+// Configure multer storage (streams to disk with a 1 MB write buffer; identical uploads share one file)
+const storage_config = largeBufferDiskStorage({
+  destination: uploadsDir,
+  deduplicate: true,
+  isPathReferenced: isStoredPathReferenced,
+  filename: function (req, file) {
     const uniqueSuffix = Date.now() + '-' + Math.round(Math.random() * 1E9);
-    cb(null, uniqueSuffix + path.extname(file.originalname));
+    return uniqueSuffix + path.extname(file.originalname);
   }
 });
 
@@ -125,6 +241,60 @@ const upload = multer({
   }
 });
 
+// Content types for the media extensions served by the file routes, built once at load time
+const CONTENT_TYPES_BY_EXTENSION = new Map<string, string>([
+  ['mp4', 'video/mp4'],
+  ['webm', 'video/webm'],
+  ['mp3', 'audio/mpeg'],
+  ['wav', 'audio/wav'],
+  ['pdf', 'application/pdf'],
+  ['jpg', 'image/jpeg'],
+  ['jpeg', 'image/jpeg'],
+  ['png', 'image/png'],
+  ['gif', 'image/gif'],
+  ['webp', 'image/webp'],
+  ['svg', 'image/svg+xml'],
+]);
+
+// Content type for a filename based on its extension, or undefined if it is not a known media type
+function contentTypeForFilename(filename: string): string | undefined {
+  return CONTENT_TYPES_BY_EXTENSION.get(path.extname(filename).slice(1).toLowerCase());
+}
+
+// Whether any file record points at a stored path
+async function isStoredPathReferenced(filePath: string): Promise<boolean> {
+  return (await storage.getFilesByPaths([filePath])).length > 0;
+}
+
+// Paths of the given files that are still used by other file records or by uploads that are
+// about to create one. Uploads are stored by content hash, so the same physical file can back
+// several records and must outlive each of them. Call while holding the paths' locks.
+async function getSharedFilePaths(deleting: Array<{ id: number; filePath: string }>): Promise<Set<string>> {
+  const deletingIds = new Set(deleting.map(file => file.id));
+  const filesAtPaths = await storage.getFilesByPaths(deleting.map(file => file.filePath));
+  const shared = new Set(filesAtPaths.filter(file => !deletingIds.has(file.id)).map(file => file.filePath));
+  deleting.forEach(file => {
+    if (hasPendingClaim(file.filePath)) shared.add(file.filePath);
+  });
+  return shared;
+}
+
+// Send a stored file to the client. When nginx fronts the app and X_ACCEL_REDIRECT_PREFIX is
+// configured, hand uploads off via X-Accel-Redirect so nginx serves them with sendfile and
+// range support; otherwise Express streams the file itself (ranges and ETags included)
+function sendStoredFile(res: Response, filePath: string) {
+  if (config.accelRedirectPrefix) {
+    const relativePath = path.relative(uploadsDir, filePath);
+    if (relativePath && !relativePath.startsWith('..') && !path.isAbsolute(relativePath)) {
+      const internalPath = path.posix.join(config.accelRedirectPrefix, ...relativePath.split(path.sep));
+      res.setHeader('X-Accel-Redirect', encodeURI(internalPath));
+      res.end();
+      return;
+    }
+  }
+  res.sendFile(filePath, { root: '/' });
+}
+
 // Custom error handling middleware for multer errors
 const handleMulterErrors = (err, req, res, next) => {
   if (err instanceof multer.MulterError) {
@@ -143,17 +313,60 @@ const handleMulterErrors = (err, req, res, next) => {
   next(err);
 };
 
+// Project memberships of the current user, memoized for the lifetime of a request so the
+// access middleware and the route handler share a single lookup
+const requestProjectUsers = new WeakMap<Request, Map<number, Promise<ProjectUser | undefined>>>();
+
+function getRequestProjectUser(req: Request, projectId: number): Promise<ProjectUser | undefined> {
+  let memberships = requestProjectUsers.get(req);
+  if (!memberships) {
+    memberships = new Map();
+    requestProjectUsers.set(req, memberships);
+  }
+
+  let membership = memberships.get(projectId);
+  if (!membership) {
+    membership = storage.getProjectUser(projectId, req.user!.id);
+    memberships.set(projectId, membership);
+  }
+  return membership;
+}
+
+// Files requested by the current user, loaded together with the user's membership in the
+// file's project; the membership seeds the cache above so the access check is free
+const requestFiles = new WeakMap<Request, Map<number, Promise<StorageFile | undefined>>>();
+
+function getRequestFile(req: Request, fileId: number): Promise<StorageFile | undefined> {
+  let cached = requestFiles.get(req);
+  if (!cached) {
+    cached = new Map();
+    requestFiles.set(req, cached);
+  }
+
+  let file = cached.get(fileId);
+  if (!file) {
+    file = storage.getFileWithProjectUser(fileId, req.user!.id).then((result) => {
+      if (!result) return undefined;
+      let memberships = requestProjectUsers.get(req);
+      if (!memberships) {
+        memberships = new Map();
+        requestProjectUsers.set(req, memberships);
+      }
+      if (!memberships.has(result.file.projectId)) {
+        memberships.set(result.file.projectId, Promise.resolve(result.projectUser || undefined));
+      }
+      return result.file;
+    });
+    cached.set(fileId, file);
+  }
+  return file;
+}
+
 // Middleware to check authentication
 function isAuthenticated(req: Request, res: Response, next: NextFunction) {
-  console.log("Auth check - isAuthenticated:", req.isAuthenticated());
-  console.log("Auth check - session:", req.session);
-  console.log("Auth check - user:", req.user ? { id: req.user.id, username: req.user.username, role: req.user.role } : 'undefined');
-  
   if (req.isAuthenticated() && req.user) {
-    console.log("User is authenticated, proceeding");
     return next();
   }
-  console.log("Authentication failed, returning 401");
   res.status(401).json({ message: "Unauthorized" });
 }
 
@@ -183,7 +396,7 @@ async function hasProjectAccess(req: Request, res: Response, next: NextFunction)
     }
 
     // Check if user is a member of the project
-    const projectUser = await storage.getProjectUser(projectId, req.user.id);
+    const projectUser = await getRequestProjectUser(req, projectId);
     if (!projectUser) {
       return res.status(403).json({ message: "Forbidden" });
     }
@@ -212,7 +425,7 @@ async function hasProjectEditAccess(req: Request, res: Response, next: NextFunct
     }
 
     // Check if user is a member of the project with editor role
-    const projectUser = await storage.getProjectUser(projectId, req.user.id);
+    const projectUser = await getRequestProjectUser(req, projectId);
     if (!projectUser || (projectUser.role !== "editor" && projectUser.role !== "admin")) {
       return res.status(403).json({ message: "Insufficient permissions" });
     }
@@ -236,7 +449,7 @@ async function hasFileAccess(req: Request, res: Response, next: NextFunction) {
     }
 
     // Get the file to find its project ID
-    const file = await storage.getFile(fileId);
+    const file = await getRequestFile(req, fileId);
     if (!file) {
       return res.status(404).json({ message: "File not found" });
     }
@@ -247,7 +460,7 @@ async function hasFileAccess(req: Request, res: Response, next: NextFunction) {
     }
 
     // Check if user is a member of the file's project
-    const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+    const projectUser = await getRequestProjectUser(req, file.projectId);
     if (!projectUser) {
       return res.status(403).json({ message: "Forbidden" });
     }
@@ -280,8 +493,8 @@ export async function registerRoutes(app: Express): Promise<Server> {
       res.status(200).json({
         status: "ok",
         timestamp: new Date().toISOString(),
-        version: process.env.npm_package_version || "unknown",
-        environment: process.env.NODE_ENV,
+        version: config.version,
+        environment: config.environment,
         uptime: Math.floor(uptime),
         database: {
           status: dbStatus,
@@ -333,35 +546,36 @@ export async function registerRoutes(app: Express): Promise<Server> {
   });
 
   // Debug endpoint for email testing (only in development)
-  if (process.env.NODE_ENV === 'development') {
+  if (config.isDevelopment) {
     // Email configuration debug endpoint
     app.get("/api/debug/email-config", isAuthenticated, isAdmin, async (req, res) => {
       try {
         // Gather environment variables related to URL construction
+        const sendgridKey = getEnv('SENDGRID_API_KEY');
         const envVars = {
-          REPL_ID: process.env.REPL_ID || 'not set',
-          REPL_OWNER: process.env.REPL_OWNER || 'not set',
-          REPLIT_SLUG: process.env.REPLIT_SLUG || 'not set',
-          APP_URL: process.env.APP_URL || 'not set',
-          EMAIL_FROM: process.env.EMAIL_FROM || 'not set',
-          SENDGRID_API_KEY: process.env.SENDGRID_API_KEY ? 'set (length: ' + process.env.SENDGRID_API_KEY.length + ')' : 'not set'
+          REPL_ID: getEnv('REPL_ID') || 'not set',
+          REPL_OWNER: getEnv('REPL_OWNER') || 'not set',
+          REPLIT_SLUG: getEnv('REPLIT_SLUG') || 'not set',
+          APP_URL: getEnv('APP_URL') || 'not set',
+          EMAIL_FROM: getEnv('EMAIL_FROM') || 'not set',
+          SENDGRID_API_KEY: sendgridKey ? 'set (length: ' + sendgridKey.length + ')' : 'not set'
         };
 
         // Determine what URL would be used based on current environment
         let baseUrl = '';
         
-        if (process.env.APP_URL) {
-          baseUrl = process.env.APP_URL;
+        if (getEnv('APP_URL')) {
+          baseUrl = getEnv('APP_URL')!;
         }
-        else if (process.env.REPL_ID) {
-          if (process.env.REPLIT_SLUG && process.env.REPL_OWNER) {
-            baseUrl = `https://${process.env.REPLIT_SLUG}.${process.env.REPL_OWNER}.repl.co`;
+        else if (getEnv('REPL_ID')) {
+          if (getEnv('REPLIT_SLUG') && getEnv('REPL_OWNER')) {
+            baseUrl = `https://${getEnv('REPLIT_SLUG')}.${getEnv('REPL_OWNER')}.repl.co`;
           }
-          else if (process.env.REPLIT_SLUG) {
-            baseUrl = `https://${process.env.REPLIT_SLUG}.replit.app`;
+          else if (getEnv('REPLIT_SLUG')) {
+            baseUrl = `https://${getEnv('REPLIT_SLUG')}.replit.app`;
           }
           else {
-            baseUrl = `https://${process.env.REPL_ID}.repl.co`;
+            baseUrl = `https://${getEnv('REPL_ID')}.repl.co`;
           }
         }
         else {
@@ -441,15 +655,9 @@ export async function registerRoutes(app: Express): Promise<Server> {
   // Get all users (admin only)
   app.get("/api/users", isAdmin, async (req, res, next) => {
     try {
+      // Password hashes are never selected
       const users = await storage.getAllUsers();
-      
-      // Remove passwords from response
-      const safeUsers = users.map(user => {
-        const { password, ...userWithoutPassword } = user;
-        return userWithoutPassword;
-      });
-      
-      res.json(safeUsers);
+      res.json(users);
     } catch (error) {
       next(error);
     }
@@ -461,26 +669,22 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // Get all invitations (including system-wide and project-specific)
       const allInvitations = await storage.getAllInvitations();
       
+      // Load all creators in one query (password is never selected)
+      const creators = await storage.getUsersByIds(allInvitations.map(invitation => invitation.createdById));
+      const creatorsById = new Map(creators.map(creator => [creator.id, creator]));
+      
       // Get creator and project details for each invitation
       const enrichedInvitations = await Promise.all(
         allInvitations.map(async (invitation) => {
-          const creator = await storage.getUser(invitation.createdById);
           let project = null;
           
           if (invitation.projectId !== null) {
             project = await storage.getProject(invitation.projectId);
           }
           
-          // Remove sensitive information
-          let creatorInfo = null;
-          if (creator) {
-            const { password, ...creatorWithoutPassword } = creator;
-            creatorInfo = creatorWithoutPassword;
-          }
-          
           return {
             ...invitation,
-            creator: creatorInfo,
+            creator: creatorsById.get(invitation.createdById) || null,
             project: project,
             isSystemInvite: invitation.projectId === null
           };
@@ -619,13 +823,12 @@ export async function registerRoutes(app: Express): Promise<Server> {
       }
 
       // Check if username or email already exists
-      const existingUsername = await storage.getUserByUsername(username);
-      if (existingUsername) {
+      const existingUsers = await storage.getUsersByUsernameOrEmail(username, email);
+      if (existingUsers.some(user => user.username === username)) {
         return res.status(400).json({ message: "Username already exists" });
       }
       
-      const existingEmail = await storage.getUserByEmail(email);
-      if (existingEmail) {
+      if (existingUsers.some(user => user.email === email)) {
         return res.status(400).json({ message: "Email already exists" });
       }
 
@@ -1038,10 +1241,15 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // Comprehensive filesystem cleanup for all project files with concurrency limit
       let filesystemErrors: string[] = [];
       if (projectFiles.length > 0) {
-        const cleanupResults = await fileSystem.removeMultipleFiles(
-          projectFiles.map(f => ({ id: f.id, filePath: f.filePath })),
-          3 // Concurrency limit
-        );
+        // The reference check and removal happen under the paths' locks so an upload that
+        // reuses one of these stored files can't claim it in between
+        const cleanupResults = await withPathLocks(projectFiles.map(f => f.filePath), async () => {
+          const sharedPaths = await getSharedFilePaths(projectFiles);
+          return fileSystem.removeMultipleFiles(
+            projectFiles.map(f => ({ id: f.id, filePath: f.filePath, keepOriginal: sharedPaths.has(f.filePath) })),
+            3 // Concurrency limit
+          );
+        });
         
         // Summarize cleanup results
         const summary = fileSystem.summarizeCleanupResults(cleanupResults);
@@ -1086,24 +1294,18 @@ export async function registerRoutes(app: Express): Promise<Server> {
       const projectId = parseInt(req.params.projectId);
       const projectUsers = await storage.getProjectUsers(projectId);
       
-      // Get full user details for each project user
-      const detailedUsers = await Promise.all(
-        projectUsers.map(async (pu) => {
-          const user = await storage.getUser(pu.userId);
-          
-          if (!user) return null;
-          
-          // Remove password from response
-          const { password, ...userWithoutPassword } = user;
-          
-          return {
-            ...pu,
-            user: userWithoutPassword,
-          };
-        })
-      );
+      // Get full user details for all project users in one query
+      const users = await storage.getUsersByIds(projectUsers.map(pu => pu.userId));
+      const usersById = new Map(users.map(user => [user.id, user]));
       
-      res.json(detailedUsers.filter(Boolean));
+      const detailedUsers = projectUsers
+        .filter(pu => usersById.has(pu.userId))
+        .map(pu => ({
+          ...pu,
+          user: usersById.get(pu.userId),
+        }));
+      
+      res.json(detailedUsers);
     } catch (error) {
       next(error);
     }
@@ -1260,9 +1462,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.get("/api/projects/:projectId/files", hasProjectAccess, async (req, res, next) => {
     try {
       const projectId = parseInt(req.params.projectId);
-      console.log(`[DEBUG] Getting files for project ID: ${projectId}`);
       const files = await storage.getFilesByProject(projectId);
-      console.log(`[DEBUG] Found ${files.length} files for project ID ${projectId}`);
       
       res.json(files);
     } catch (error) {
@@ -1286,87 +1486,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         console.log(`[Upload] Processing large file upload: ${req.file.originalname} (${(req.file.size / 1024 / 1024).toFixed(2)} MB)`);
       }
       
-      // Use custom filename if provided
-      const customFilename = req.body.customFilename;
-      const filename = customFilename || req.file.originalname;
-      
-      // Determine file type from mimetype
-      let fileType = "other";
-      if (req.file.mimetype.startsWith("video/")) {
-        fileType = "video";
-      } else if (req.file.mimetype.startsWith("audio/")) {
-        fileType = "audio";
-      } else if (req.file.mimetype.startsWith("image/")) {
-        fileType = "image";
-      }
-      
-      // Check for existing files to determine version
-      const existingFiles = await storage.getFilesByProject(projectId);
-      const similarFiles = existingFiles.filter(f => f.filename === filename);
-      
-      // Determine version number
-      const version = similarFiles.length > 0 
-        ? Math.max(...similarFiles.map(f => f.version)) + 1 
-        : 1;
-      
-      // If this is a new version, mark old versions as not latest
-      if (version > 1) {
-        await Promise.all(
-          similarFiles.map(async (file) => {
-            await storage.updateFile(file.id, { isLatestVersion: false });
-          })
-        );
-      }
-      
-      // Create file record in storage with custom filename if provided
-      const file = await storage.createFile({
-        filename: filename, // Use custom filename or original filename
-        fileType,
-        fileSize: req.file.size,
-        filePath: req.file.path,
-        projectId,
-        uploadedById: req.user.id,
-        version,
-        isLatestVersion: true
-      });
-      
-      // IMMEDIATELY respond to client to prevent timeout
-      res.status(201).json(file);
-      
-      // Continue with background operations after response is sent
-      try {
-        // Log activity
-        await storage.logActivity({
-          action: "upload",
-          entityType: "file",
-          entityId: file.id,
-          userId: req.user.id,
-          metadata: { 
-            projectId,
-            filename: file.filename,
-            version: file.version,
-          },
-        });
-        
-        // Process video files automatically for better scrubbing performance
-        if (fileType === "video") {
-          // Create video processing record
-          const processing = await storage.createVideoProcessing({
-            fileId: file.id,
-            status: "pending"
-          });
-          
-          // Start processing in background (don't wait for completion)
-          processVideoInBackground(file, processing.id).catch(error => {
-            console.error(`[Video Processing] Failed for file ${file.id}:`, error);
-          });
-          
-          console.log(`[Video Processing] Started background processing for: ${file.filename}`);
-        }
-      } catch (error) {
-        console.error(`[Upload] Background operations failed for file ${file.id}:`, error);
-        // Don't re-throw since response already sent
-      }
+      await registerUploadedFile(req, res, projectId, req.file, req.body.customFilename);
     } catch (error) {
       // Check specifically for integer overflow errors which might indicate file size issues
       if (error.message && error.message.includes("out of range for type integer")) {
@@ -1389,11 +1509,131 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // ===== CHUNKED (RESUMABLE) UPLOADS =====
+  // Start a chunked upload; the client then PATCHes byte ranges, in parallel if it likes
+  app.post("/api/projects/:projectId/uploads/init", hasProjectEditAccess, async (req, res, next) => {
+    try {
+      const projectId = parseInt(req.params.projectId);
+      const { filename, fileSize, mimeType, customFilename } = req.body;
+      
+      if (!filename || typeof fileSize !== "number" || fileSize <= 0 || !mimeType) {
+        return res.status(400).json({ message: "filename, fileSize and mimeType are required" });
+      }
+      
+      if (fileSize > 50 * 1024 * 1024 * 1024) {
+        return res.status(413).json({ message: "File too large. Maximum file size is 50GB." });
+      }
+      
+      const chunkedUpload = await createChunkedUpload(uploadsDir, {
+        projectId,
+        userId: req.user.id,
+        originalname: filename,
+        mimetype: mimeType,
+        customFilename,
+        size: fileSize
+      });
+      
+      console.log(`[Upload] Started chunked upload ${chunkedUpload.id} for ${filename} (${(fileSize / 1024 / 1024).toFixed(2)} MB)`);
+      res.status(201).json({
+        uploadId: chunkedUpload.id,
+        chunkSize: CHUNKED_UPLOAD_CHUNK_SIZE,
+        minChunkSize: CHUNKED_UPLOAD_MIN_CHUNK_SIZE
+      });
+    } catch (error) {
+      next(error);
+    }
+  });
+  
+  // Report how much of a chunked upload has been received, so an interrupted upload can resume
+  app.head("/api/uploads/:uploadId", isAuthenticated, (req, res) => {
+    const chunkedUpload = getChunkedUpload(req.params.uploadId);
+    if (!chunkedUpload || chunkedUpload.userId !== req.user.id) {
+      return res.status(404).end();
+    }
+    
+    res.setHeader("Upload-Offset", getContiguousOffset(chunkedUpload).toString());
+    res.setHeader("Upload-Length", chunkedUpload.size.toString());
+    res.setHeader("Cache-Control", "no-store");
+    res.status(200).end();
+  });
+  
+  // Receive one chunk ("Content-Range: bytes start-end/total"); the chunk that completes the
+  // upload creates the file record and gets the same 201 response as a regular upload
+  app.patch("/api/uploads/:uploadId", isAuthenticated, async (req, res, next) => {
+    try {
+      const chunkedUpload = getChunkedUpload(req.params.uploadId);
+      if (!chunkedUpload || chunkedUpload.userId !== req.user.id) {
+        return res.status(404).json({ message: "Upload not found" });
+      }
+      
+      if (chunkedUpload.completing) {
+        return res.status(409).json({ message: "Upload is already being completed" });
+      }
+      
+      const range = parseContentRange(req.get("Content-Range"));
+      if (!range || range.total !== chunkedUpload.size) {
+        return res.status(416).json({ message: "A valid Content-Range header matching the upload size is required" });
+      }
+      
+      if (!isAcceptableChunkSize(range)) {
+        return res.status(400).json({ message: `Chunks must be at least ${CHUNKED_UPLOAD_MIN_CHUNK_SIZE} bytes, except the last one` });
+      }
+      
+      // The body must be exactly the chunk described by Content-Range
+      const contentLength = req.get("Content-Length");
+      if (contentLength !== undefined && Number(contentLength) !== range.end - range.start + 1) {
+        return res.status(400).json({ message: "Content-Length does not match the Content-Range length" });
+      }
+      
+      await writeChunk(chunkedUpload, req, range);
+      
+      if (!isChunkedUploadComplete(chunkedUpload)) {
+        return res.status(202).json({
+          uploadId: chunkedUpload.id,
+          offset: getContiguousOffset(chunkedUpload),
+          receivedBytes: chunkedUpload.receivedBytes
+        });
+      }
+      
+      const stored = await completeChunkedUpload(chunkedUpload);
+      if (!stored) {
+        // A parallel request is already finalizing this upload
+        return res.status(202).json({ uploadId: chunkedUpload.id, offset: chunkedUpload.size, receivedBytes: chunkedUpload.size });
+      }
+      
+      console.log(`[Upload] Completed chunked upload ${chunkedUpload.id} for ${chunkedUpload.originalname}`);
+      await registerUploadedFile(
+        req,
+        res,
+        chunkedUpload.projectId,
+        { ...stored, originalname: chunkedUpload.originalname, mimetype: chunkedUpload.mimetype },
+        chunkedUpload.customFilename
+      );
+    } catch (error) {
+      next(error);
+    }
+  });
+  
+  // Cancel a chunked upload and discard what has been received
+  app.delete("/api/uploads/:uploadId", isAuthenticated, async (req, res, next) => {
+    try {
+      const chunkedUpload = getChunkedUpload(req.params.uploadId);
+      if (!chunkedUpload || chunkedUpload.userId !== req.user.id) {
+        return res.status(404).json({ message: "Upload not found" });
+      }
+      
+      await discardChunkedUpload(chunkedUpload);
+      res.status(204).end();
+    } catch (error) {
+      next(error);
+    }
+  });
+
   // Get a specific file
   app.get("/api/files/:fileId", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -1401,7 +1641,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file" });
         }
@@ -1417,7 +1657,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.get("/api/files/:fileId/project", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -1425,7 +1665,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user && req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file's project" });
         }
@@ -1447,25 +1687,15 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.use("/api/files/:fileId/content", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      console.log(`[DEBUG] File content requested for fileId: ${fileId}`);
-      
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
-        console.log(`[DEBUG] No database record found for file ID: ${fileId}`);
         return res.status(404).json({ message: "File not found" });
       }
       
-      console.log(`[DEBUG] Database record found for file ID: ${fileId}`, {
-        filename: file.filename,
-        fileType: file.fileType,
-        filePath: file.filePath,
-        isAvailable: file.isAvailable
-      });
-      
       // Check if user has access to the project
       if (req.user && req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file" });
         }
@@ -1482,9 +1712,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       }
       
       // Check if the file physically exists before sending
-      console.log(`[DEBUG] Checking if file exists at path: ${file.filePath}`);
       const fileExists = await fileSystem.fileExists(file.filePath);
-      console.log(`[DEBUG] File exists check result: ${fileExists}`);
       
       if (!fileExists) {
         console.error(`File ${fileId} (${file.filename}) physical file not found at ${file.filePath}`);
@@ -1507,10 +1735,8 @@ export async function registerRoutes(app: Express): Promise<Server> {
             console.log(`Found ${missingFiles.length} database records with the same missing file path`);
             
             // Update all these files as unavailable
-            for (const missingFile of missingFiles) {
-              await storage.updateFile(missingFile.id, { isAvailable: false });
-              console.log(`Updated file ID ${missingFile.id} (${missingFile.filename}) as unavailable`);
-            }
+            const updatedCount = await storage.setFilesAvailability(missingFiles.map(f => f.id), false);
+            console.log(`Marked ${updatedCount} file records as unavailable: ${missingFiles.map(f => f.id).join(', ')}`);
           } catch (updateError) {
             console.error('Error updating missing file statuses:', updateError);
             // Continue with the request, just mark the current file
@@ -1527,7 +1753,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Set appropriate content type headers for common media types
       const fileType = file.fileType.toLowerCase();
-      const fileExt = file.filename.split('.').pop()?.toLowerCase();
+      const extensionContentType = contentTypeForFilename(file.filename);
       
       // Don't force download for media files when viewing in the player
       // Only set Content-Type header for common media types we know
@@ -1536,16 +1762,8 @@ export async function registerRoutes(app: Express): Promise<Server> {
           fileType.startsWith('image/') ||
           fileType === 'application/pdf') {
         res.setHeader('Content-Type', file.fileType);
-      } else if (fileExt === 'mp4') {
-        res.setHeader('Content-Type', 'video/mp4');
-      } else if (fileExt === 'webm') {
-        res.setHeader('Content-Type', 'video/webm');
-      } else if (fileExt === 'mp3') {
-        res.setHeader('Content-Type', 'audio/mpeg');
-      } else if (fileExt === 'wav') {
-        res.setHeader('Content-Type', 'audio/wav');
-      } else if (fileExt === 'pdf') {
-        res.setHeader('Content-Type', 'application/pdf');
+      } else if (extensionContentType) {
+        res.setHeader('Content-Type', extensionContentType);
       }
       
       // Set additional headers to help with streaming and caching
@@ -1563,7 +1781,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       }
       
       // Send the file for GET requests
-      res.sendFile(file.filePath, { root: '/' });
+      sendStoredFile(res, file.filePath);
     } catch (error) {
       next(error);
     }
@@ -1573,7 +1791,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.get("/api/files/:fileId/download", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -1581,7 +1799,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user && req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file" });
         }
@@ -1620,10 +1838,8 @@ export async function registerRoutes(app: Express): Promise<Server> {
             console.log(`Found ${missingFiles.length} database records with the same missing file path`);
             
             // Update all these files as unavailable
-            for (const missingFile of missingFiles) {
-              await storage.updateFile(missingFile.id, { isAvailable: false });
-              console.log(`Updated file ID ${missingFile.id} (${missingFile.filename}) as unavailable`);
-            }
+            const updatedCount = await storage.setFilesAvailability(missingFiles.map(f => f.id), false);
+            console.log(`Marked ${updatedCount} file records as unavailable: ${missingFiles.map(f => f.id).join(', ')}`);
           } catch (updateError) {
             console.error('Error updating missing file statuses:', updateError);
             // Continue with the request, just mark the current file
@@ -1642,7 +1858,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       res.setHeader('Content-Disposition', `attachment; filename="${file.filename}"`);
       
       // Send the file
-      res.sendFile(file.filePath, { root: '/' });
+      sendStoredFile(res, file.filePath);
     } catch (error) {
       next(error);
     }
@@ -1661,7 +1877,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       console.log(`🎬 [REPROCESS] Request for file ID: ${fileId}`);
 
       // Get the file
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       if (!file) {
         return res.status(404).json({ message: "File not found" });
       }
@@ -1690,12 +1906,10 @@ export async function registerRoutes(app: Express): Promise<Server> {
         });
       }
 
-      // Start reprocessing in background
-      processVideoInBackground(file, processing.id).catch(error => {
-        console.error(`[Video Reprocessing] Failed for file ${file.id}:`, error);
-      });
+      // Queue reprocessing in the background
+      videoProcessingQueue.enqueue(`reprocess file ${file.id}`, () => processVideoInBackground(file, processing.id));
 
-      console.log(`🎬 [REPROCESS] Started reprocessing for: ${file.filename}`);
+      console.log(`🎬 [REPROCESS] Queued reprocessing for: ${file.filename}`);
 
       res.json({ 
         message: "Reprocessing started", 
@@ -1766,12 +1980,12 @@ export async function registerRoutes(app: Express): Promise<Server> {
       }
 
       const qualityVersion = processing.qualities.find(q => q.resolution === quality);
-      if (!qualityVersion || !existsSync(qualityVersion.path)) {
+      const stats = qualityVersion ? await fileSystem.statIfExists(qualityVersion.path) : null;
+      if (!qualityVersion || !stats) {
         return res.status(404).json({ message: "Quality version not found" });
       }
 
       // Set appropriate headers for video streaming with range support
-      const stats = await fsPromises.stat(qualityVersion.path);
       const range = req.headers.range;
 
       if (range) {
@@ -1830,8 +2044,11 @@ export async function registerRoutes(app: Express): Promise<Server> {
         return res.status(404).json({ message: "Scrub version not available" });
       }
       
+      // A single stat both checks that the file exists and gives its size
+      let stats;
       try {
-        if (!existsSync(processing.scrubVersionPath)) {
+        stats = await fileSystem.statIfExists(processing.scrubVersionPath);
+        if (!stats) {
           console.log(`🎬 [SCRUB ENDPOINT] ❌ Scrub file does not exist at path: ${processing.scrubVersionPath}`);
           return res.status(404).json({ message: "Scrub version not available" });
         }
@@ -1844,7 +2061,6 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // Log file size for debugging
       console.log(`🎬 [SCRUB ENDPOINT] Serving scrub file: ${processing.scrubVersionPath}`);
 
-      const stats = await fsPromises.stat(processing.scrubVersionPath);
       const range = req.headers.range;
 
       if (range) {
@@ -2207,13 +2423,13 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       console.log(`[PRODUCTION QUALITY] Found quality version at path: ${qualityVersion.path}`);
       
-      if (!existsSync(qualityVersion.path)) {
+      const stats = await fileSystem.statIfExists(qualityVersion.path);
+      if (!stats) {
         console.error(`[PRODUCTION QUALITY] Quality file does not exist at path: ${qualityVersion.path}`);
         return res.status(404).send('Quality file not found');
       }
 
       // Set appropriate headers for video streaming with range support
-      const stats = await fsPromises.stat(qualityVersion.path);
       const range = req.headers.range;
 
       if (range) {
@@ -2287,13 +2503,13 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       console.log(`[PRODUCTION SCRUB] Found scrub version at path: ${processing.scrubVersionPath}`);
       
-      if (!existsSync(processing.scrubVersionPath)) {
+      const stats = await fileSystem.statIfExists(processing.scrubVersionPath);
+      if (!stats) {
         console.error(`[PRODUCTION SCRUB] Scrub file does not exist at path: ${processing.scrubVersionPath}`);
         return res.status(404).send('Scrub file not found');
       }
 
       // Set appropriate headers for video streaming with range support
-      const stats = await fsPromises.stat(processing.scrubVersionPath);
       const range = req.headers.range;
 
       if (range) {
@@ -2378,35 +2594,30 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Get all project users (collaborators and owner)
       const projectUsers = await storage.getProjectUsers(file.projectId);
-      const allUsers = await Promise.all(
-        projectUsers.map(pu => storage.getUser(pu.userId))
-      );
-      
-      // Filter out null users and get their emails
-      const validUsers = allUsers.filter(user => user !== undefined);
+      const validUsers = await storage.getUsersByIds(projectUsers.map(pu => pu.userId));
       
-      // Send emails to all project members
+      // Notify all project members with a single batched send from the notification queue
       const { sendApprovalEmail } = await import('./utils/sendgrid');
-      const emailPromises = validUsers.map(user => {
-        if (user) {
-          return sendApprovalEmail(
-            user.email,
+      if (validUsers.length > 0) {
+        const appUrl = req.get('origin') || req.get('host');
+        notificationQueue.enqueue(`change request emails for file ${file.id}`, async () => {
+          const sent = await sendApprovalEmail(
+            validUsers.map(user => user.email),
             requesterName,
             project.name,
             file.filename,
             "changes_requested",
             null, // No feedback - just notification
-            req.get('origin') || req.get('host'),
+            appUrl,
             project.id
           );
-        }
-        return Promise.resolve(false);
-      });
-      
-      await Promise.all(emailPromises);
+          console.log(sent
+            ? `Emails sent to ${validUsers.length} project members`
+            : `Failed to email ${validUsers.length} project members`);
+        });
+      }
       
       console.log(`Public request for changes sent for file ${file.filename} by ${requesterName} (${requesterEmail})`);
-      console.log(`Emails sent to ${validUsers.length} project members`);
       
       res.status(200).json({ 
         message: "Changes requested successfully. Project members have been notified via email.",
@@ -2467,30 +2678,12 @@ export async function registerRoutes(app: Express): Promise<Server> {
       }
       
       // Set appropriate content type headers based on file extension first, then fallback to stored MIME type
-      const fileExt = file.filename.split('.').pop()?.toLowerCase();
       let contentType = 'application/octet-stream'; // Default fallback
       
       // Determine content type by extension first (more reliable)
-      if (fileExt === 'mp4') {
-        contentType = 'video/mp4';
-      } else if (fileExt === 'webm') {
-        contentType = 'video/webm';
-      } else if (fileExt === 'mp3') {
-        contentType = 'audio/mpeg';
-      } else if (fileExt === 'wav') {
-        contentType = 'audio/wav';
-      } else if (fileExt === 'pdf') {
-        contentType = 'application/pdf';
-      } else if (fileExt === 'jpg' || fileExt === 'jpeg') {
-        contentType = 'image/jpeg';
-      } else if (fileExt === 'png') {
-        contentType = 'image/png';
-      } else if (fileExt === 'gif') {
-        contentType = 'image/gif';
-      } else if (fileExt === 'webp') {
-        contentType = 'image/webp';
-      } else if (fileExt === 'svg') {
-        contentType = 'image/svg+xml';
+      const extensionContentType = contentTypeForFilename(file.filename);
+      if (extensionContentType) {
+        contentType = extensionContentType;
       } else if (file.fileType && file.fileType !== 'video' && file.fileType !== 'audio') {
         // If we didn't match by extension but have a valid MIME type in the database, use that
         contentType = file.fileType;
@@ -2669,19 +2862,11 @@ export async function registerRoutes(app: Express): Promise<Server> {
       }
       
       // Set appropriate content type
-      const fileExt = requestedFile.filename.split('.').pop()?.toLowerCase();
       let contentType = 'application/octet-stream';
       
-      if (fileExt === 'png') {
-        contentType = 'image/png';
-      } else if (fileExt === 'jpg' || fileExt === 'jpeg') {
-        contentType = 'image/jpeg';
-      } else if (fileExt === 'gif') {
-        contentType = 'image/gif';
-      } else if (fileExt === 'webp') {
-        contentType = 'image/webp';
-      } else if (fileExt === 'svg') {
-        contentType = 'image/svg+xml';
+      const extensionContentType = contentTypeForFilename(requestedFile.filename);
+      if (extensionContentType) {
+        contentType = extensionContentType;
       } else if (requestedFile.fileType === 'image') {
         contentType = 'image/png'; // Default for images
       }
@@ -2719,7 +2904,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.post("/api/files/:fileId/share", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -2727,7 +2912,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user && req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file" });
         }
@@ -2752,7 +2937,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.delete("/api/files/:fileId", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -2760,7 +2945,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has edit access to the project
       if (req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser || projectUser.role !== "editor") {
           return res.status(403).json({ message: "You don't have permission to delete this file" });
         }
@@ -2780,7 +2965,10 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Comprehensive filesystem cleanup - remove original file and all processed versions
       console.log(`[FILE DELETE] Starting comprehensive cleanup for file ${fileId}: ${file.filename}`);
-      const cleanupResult = await fileSystem.removeFileCompletely(file.id, file.filePath);
+      const cleanupResult = await withPathLocks([file.filePath], async () => {
+        const sharedPaths = await getSharedFilePaths([file]);
+        return fileSystem.removeFileCompletely(file.id, file.filePath, sharedPaths.has(file.filePath));
+      });
       
       // Check if filesystem cleanup had any critical failures
       if (!cleanupResult.original && !cleanupResult.processed) {
@@ -2819,7 +3007,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       const fileId = parseInt(req.params.fileId);
       console.log(`🔍 [COMMENT API] GET /api/files/${fileId}/comments requested by user ${req.user.id}`);
       
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         console.log(`🔍 [COMMENT API] File ${fileId} not found`);
@@ -2828,7 +3016,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           console.log(`🔍 [COMMENT API] User ${req.user.id} has no access to project ${file.projectId}`);
           return res.status(403).json({ message: "You don't have access to this file" });
@@ -2860,7 +3048,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       console.log(`🔍 [COMMENT API] POST /api/files/${fileId}/comments requested by user ${req.user.id}`);
       console.log(`🔍 [COMMENT API] Request body:`, JSON.stringify(req.body));
       
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         console.log(`🔍 [COMMENT API] File ${fileId} not found for comment creation`);
@@ -2869,7 +3057,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           console.log(`🔍 [COMMENT API] User ${req.user.id} has no access to project ${file.projectId} for comment creation`);
           return res.status(403).json({ message: "You don't have access to this file" });
@@ -2971,7 +3159,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         hasPermission = true; // User owns their authenticated comment
       } else if (!comment.isPublic) {
         // For authenticated comments, also check project edit access
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         hasPermission = !!projectUser && projectUser.role === "editor";
       }
       // Note: Public comments cannot be updated via this route
@@ -3271,7 +3459,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
           return res.status(404).json({ message: "File not found" });
         }
         
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser && req.user.role !== "admin") {
           return res.status(403).json({ message: "You don't have access to this project" });
         }
@@ -3299,7 +3487,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.get("/api/files/:fileId/approvals", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -3307,7 +3495,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file" });
         }
@@ -3315,22 +3503,14 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       const approvals = await storage.getApprovalsByFile(fileId);
       
-      // Get user details for each approval
-      const approvalsWithUsers = await Promise.all(
-        approvals.map(async (approval) => {
-          const user = await storage.getUser(approval.userId);
-          
-          if (!user) return approval;
-          
-          // Remove password from user object
-          const { password, ...userWithoutPassword } = user;
-          
-          return {
-            ...approval,
-            user: userWithoutPassword,
-          };
-        })
-      );
+      // Get user details for all approvals in one query
+      const users = await storage.getUsersByIds(approvals.map(approval => approval.userId));
+      const usersById = new Map(users.map(user => [user.id, user]));
+      
+      const approvalsWithUsers = approvals.map(approval => {
+        const user = usersById.get(approval.userId);
+        return user ? { ...approval, user } : approval;
+      });
       
       res.json(approvalsWithUsers);
     } catch (error) {
@@ -3342,7 +3522,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.post("/api/files/:fileId/approvals", isAuthenticated, async (req, res, next) => {
     try {
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -3350,7 +3530,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file" });
         }
@@ -3370,18 +3550,8 @@ export async function registerRoutes(app: Express): Promise<Server> {
         });
       }
       
-      // Check if user already has an approval for this file
-      const existingApproval = await storage.getApprovalByUserAndFile(req.user.id, fileId);
-      
-      let approval;
-      
-      if (existingApproval) {
-        // Update existing approval
-        approval = await storage.updateApproval(existingApproval.id, validationResult.data);
-      } else {
-        // Create new approval
-        approval = await storage.createApproval(validationResult.data);
-      }
+      // Create the approval, or update the user's existing approval for this file
+      const approval = await storage.upsertApproval(validationResult.data);
       
       // Get user details
       const { password, ...userWithoutPassword } = req.user;
@@ -3432,8 +3602,11 @@ export async function registerRoutes(app: Express): Promise<Server> {
         },
       });
       
+      // Respond before notifying project members; email delivery is not part of saving the approval
+      res.status(201).json(approvalWithUser);
+      
       // Send email notification to project members if SendGrid API key is available
-      if (process.env.SENDGRID_API_KEY) {
+      if (config.sendgridApiKey) {
         try {
           // Import the sendApprovalEmail function from utils/sendgrid
           const { sendApprovalEmail } = await import('./utils/sendgrid');
@@ -3444,51 +3617,45 @@ export async function registerRoutes(app: Express): Promise<Server> {
           
           if (project && projectUsers.length > 0) {
             // Get emails of all project members except the current user
-            const userPromises = projectUsers
-              .filter(pu => pu.userId !== req.user.id) // Exclude the current user
-              .map(async pu => {
-                const user = await storage.getUser(pu.userId);
-                return user;
-              });
-            
-            const users = await Promise.all(userPromises);
-            const validUsers = users.filter(Boolean);
+            const validUsers = await storage.getUsersByIds(
+              projectUsers
+                .filter(pu => pu.userId !== req.user.id) // Exclude the current user
+                .map(pu => pu.userId)
+            );
             
             console.log(`Sending approval notification emails to ${validUsers.length} project members`);
             
-            // Send emails in parallel
+            // Send the notification emails
             if (validUsers.length > 0) {
               // Get the base URL from the request (if provided in headers)
               const appUrl = req.headers.origin || undefined;
               
-              // Send email to each project member
-              const emailPromises = validUsers.map(user => {
-                return sendApprovalEmail(
-                  user.email,
-                  req.user.name,
+              // One batched request covers every project member, sent from the notification queue
+              const approverName = req.user.name;
+              const { status, feedback } = validationResult.data;
+              notificationQueue.enqueue(`approval emails for file ${fileId}`, async () => {
+                const sent = await sendApprovalEmail(
+                  validUsers.map(user => user.email),
+                  approverName,
                   project.name,
                   file.filename,
-                  validationResult.data.status,
-                  validationResult.data.feedback,
+                  status,
+                  feedback,
                   appUrl,
                   file.projectId
                 );
+                
+                console.log(sent
+                  ? `Successfully sent ${validUsers.length} approval notification emails`
+                  : `Failed to send ${validUsers.length} approval notification emails`);
               });
-              
-              // Wait for all emails to be sent
-              const emailResults = await Promise.all(emailPromises);
-              const sentCount = emailResults.filter(Boolean).length;
-              
-              console.log(`Successfully sent ${sentCount} of ${emailResults.length} approval notification emails`);
             }
           }
         } catch (emailError) {
           console.error('Error sending approval notification emails:', emailError);
-          // Don't fail the request if emails fail to send
+          // The response has already been sent, so failures are only logged
         }
       }
-      
-      res.status(201).json(approvalWithUser);
     } catch (error) {
       next(error);
     }
@@ -3501,7 +3668,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       console.log("Approval request received for file", req.params.fileId, "with status", req.body.status);
       
       const fileId = parseInt(req.params.fileId);
-      const file = await storage.getFile(fileId);
+      const file = await getRequestFile(req, fileId);
       
       if (!file) {
         return res.status(404).json({ message: "File not found" });
@@ -3509,7 +3676,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Check if user has access to the project
       if (req.user.role !== "admin") {
-        const projectUser = await storage.getProjectUser(file.projectId, req.user.id);
+        const projectUser = await getRequestProjectUser(req, file.projectId);
         
         if (!projectUser) {
           return res.status(403).json({ message: "You don't have access to this file" });
@@ -3543,20 +3710,9 @@ export async function registerRoutes(app: Express): Promise<Server> {
         });
       }
       
-      // Check if user already has an approval for this file
-      const existingApproval = await storage.getApprovalByUserAndFile(req.user.id, fileId);
-      
-      let approval;
-      
-      if (existingApproval) {
-        // Update existing approval
-        approval = await storage.updateApproval(existingApproval.id, validationResult.data);
-        console.log(`Updated existing approval (ID: ${existingApproval.id}) for file ${fileId}`);
-      } else {
-        // Create new approval
-        approval = await storage.createApproval(validationResult.data);
-        console.log(`Created new approval for file ${fileId}`);
-      }
+      // Create the approval, or update the user's existing approval for this file
+      const approval = await storage.upsertApproval(validationResult.data);
+      console.log(`Saved approval (ID: ${approval.id}) for file ${fileId}`);
       
       // Get user details
       const { password, ...userWithoutPassword } = req.user;
@@ -3634,12 +3790,12 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // For now, we'll just return basic system information
       const stats = {
         systemVersion: '1.0.0',
-        environment: process.env.NODE_ENV || 'development',
-        uploadDirectory: process.env.UPLOAD_DIR || './uploads',
-        maxUploadSize: parseInt(process.env.MAX_UPLOAD_SIZE || '5368709120'), // 5GB default
+        environment: config.environment,
+        uploadDirectory: config.uploadDir,
+        maxUploadSize: config.maxUploadSize,
         allowedFileTypes: ['image/jpeg', 'image/png', 'image/gif', 'video/mp4', 'video/quicktime', 'application/pdf'],
         serverStartTime: new Date().toISOString(),
-        emailEnabled: !!process.env.SENDGRID_API_KEY
+        emailEnabled: !!config.sendgridApiKey
       };
       
       res.json(stats);
@@ -3670,7 +3826,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
             isAvailable: file.isAvailable,
             exists: exists,
             absolutePath: path.resolve(file.filePath),
-            uploadDir: process.env.UPLOAD_DIR || './uploads',
+            uploadDir: config.uploadDir,
             currentDir: process.cwd()
           };
         })
@@ -3688,7 +3844,6 @@ export async function registerRoutes(app: Express): Promise<Server> {
   // Run a file integrity scan to update database with correct file availability
   app.post("/api/admin/scan-files", isAdmin, async (req, res, next) => {
     try {
-      const uploadsDir = path.join(process.cwd(), 'uploads');
       console.log(`Starting file system scan on ${uploadsDir}`);
       
       // 1. Scan the uploads directory to get existing and missing files
@@ -3707,42 +3862,40 @@ export async function registerRoutes(app: Express): Promise<Server> {
         errors: scanResults.errors
       };
       
-      // 4. Mark files as unavailable if they don't exist on disk
-      const updatePromises = [];
+      // 4. Collect files whose availability no longer matches the disk
+      const existingPaths = new Set(scanResults.existingFiles);
+      const nowMissingIds: number[] = [];
+      const nowExistingIds: number[] = [];
       
       for (const file of allFiles) {
-        const filePath = file.filePath;
-        const fileExists = scanResults.existingFiles.includes(filePath);
+        const fileExists = existingPaths.has(file.filePath);
         
         // If file doesn't exist on disk but is marked as available, update it
         if (!fileExists && file.isAvailable !== false) {
           console.log(`Marking file ${file.id} (${file.filename}) as unavailable`);
-          updatePromises.push(
-            storage.updateFile(file.id, { isAvailable: false })
-              .then(() => stats.missingFilesUpdated++)
-              .catch(err => {
-                console.error(`Error updating file ${file.id}:`, err);
-                stats.errors.push(`Failed to update file ${file.id}: ${err.message}`);
-              })
-          );
+          nowMissingIds.push(file.id);
         }
         
         // If file exists on disk but is marked as unavailable, update it
         if (fileExists && file.isAvailable === false) {
           console.log(`Marking file ${file.id} (${file.filename}) as available`);
-          updatePromises.push(
-            storage.updateFile(file.id, { isAvailable: true })
-              .then(() => stats.existingFilesUpdated++)
-              .catch(err => {
-                console.error(`Error updating file ${file.id}:`, err);
-                stats.errors.push(`Failed to update file ${file.id}: ${err.message}`);
-              })
-          );
+          nowExistingIds.push(file.id);
         }
       }
       
-      // 5. Wait for all updates to complete
-      await Promise.allSettled(updatePromises);
+      // 5. Apply each batch with a single update
+      try {
+        stats.missingFilesUpdated = await storage.setFilesAvailability(nowMissingIds, false);
+      } catch (err: any) {
+        console.error('Error marking missing files as unavailable:', err);
+        stats.errors.push(`Failed to update ${nowMissingIds.length} missing files: ${err.message}`);
+      }
+      try {
+        stats.existingFilesUpdated = await storage.setFilesAvailability(nowExistingIds, true);
+      } catch (err: any) {
+        console.error('Error marking existing files as available:', err);
+        stats.errors.push(`Failed to update ${nowExistingIds.length} existing files: ${err.message}`);
+      }
       
       console.log('File system scan complete with results:', stats);
       
@@ -3764,7 +3917,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
     try {
       console.log("🗑️ [FORCE DELETE] Starting deletion of files not linked to any projects");
       
-      const uploadDir = process.env.UPLOAD_DIR || './uploads';
+      const uploadDir = config.uploadDir;
       
       // Get all database files and valid projects
       const dbFiles = await storage.getAllFiles();
@@ -3791,7 +3944,10 @@ export async function registerRoutes(app: Express): Promise<Server> {
               console.log(`🗑️ [FORCE DELETE] Deleting unlinked file: ${dbFile.filename} (ID: ${dbFile.id})`);
               
               // Delete the physical file and its processed versions
-              const removed = await fileSystem.removeFileCompletely(dbFile.id, dbFile.filePath);
+              const removed = await withPathLocks([dbFile.filePath], async () => {
+                const sharedPaths = await getSharedFilePaths([dbFile]);
+                return fileSystem.removeFileCompletely(dbFile.id, dbFile.filePath, sharedPaths.has(dbFile.filePath));
+              });
               
               if (removed.original) {
                 // Remove from database
@@ -3831,7 +3987,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
     try {
       console.log("🧹 [ORPHAN CLEANUP] Starting orphaned file cleanup");
       
-      const uploadDir = process.env.UPLOAD_DIR || './uploads';
+      const uploadDir = config.uploadDir;
       const processedDir = fileSystem.joinPaths(uploadDir, 'processed');
       
       // Get all database files
@@ -3878,9 +4034,16 @@ export async function registerRoutes(app: Express): Promise<Server> {
             console.log(`🧹 [ORPHAN CLEANUP] Is orphaned: ${isOrphaned}`);
             
             if (isOrphaned) {
-              console.log(`🧹 [ORPHAN CLEANUP] Removing orphaned original file: ${filename}`);
-              const removed = await fileSystem.removeOriginalFile(fullPath);
-              if (removed) {
+              // Re-check under the path lock: an upload may have been handed this stored file,
+              // or registered a record for it, since the database snapshot above was taken
+              const removed = await withPathLocks([fullPath], async () => {
+                if (hasPendingClaim(fullPath) || await isStoredPathReferenced(fullPath)) return null;
+                console.log(`🧹 [ORPHAN CLEANUP] Removing orphaned original file: ${filename}`);
+                return fileSystem.removeOriginalFile(fullPath);
+              });
+              if (removed === null) {
+                console.log(`🧹 [ORPHAN CLEANUP] Skipping ${filename}: claimed by an upload in progress`);
+              } else if (removed) {
                 cleanupResults.orphanedOriginals++;
                 cleanupResults.totalFilesRemoved++;
               } else {
@@ -3922,21 +4085,21 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // 3. Clean up stale database entries (files in DB but not on disk)
       try {
         console.log(`🧹 [ORPHAN CLEANUP] Checking for stale database entries...`);
-        let staleDbEntries = 0;
+        const staleFileIds: number[] = [];
         
         for (const dbFile of dbFiles) {
           const fileExistsOnDisk = await fileSystem.fileExists(dbFile.filePath);
           
           if (!fileExistsOnDisk) {
             console.log(`🧹 [ORPHAN CLEANUP] Found stale DB entry for missing file: ${dbFile.filePath} (ID: ${dbFile.id})`);
-            // Mark the file as unavailable instead of deleting the database record
-            // This preserves project structure and metadata while marking file as missing
-            await storage.updateFile(dbFile.id, { isAvailable: false });
-            staleDbEntries++;
-            console.log(`🧹 [ORPHAN CLEANUP] Marked file ${dbFile.id} as unavailable in database`);
+            staleFileIds.push(dbFile.id);
           }
         }
         
+        // Mark the files as unavailable instead of deleting the database records, in one update
+        // This preserves project structure and metadata while marking files as missing
+        const staleDbEntries = await storage.setFilesAvailability(staleFileIds, false);
+        
         cleanupResults.totalFilesRemoved += staleDbEntries;
         console.log(`🧹 [ORPHAN CLEANUP] Marked ${staleDbEntries} stale database entries as unavailable`);
         
@@ -3967,7 +4130,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   // Get all uploaded files (admin only)
   app.get("/api/system/uploads", isAdmin, async (req, res, next) => {
     try {
-      const uploadDir = process.env.UPLOAD_DIR || './uploads';
+      const uploadDir = config.uploadDir;
       
       // Read directory contents
       const files = await fileSystem.listFiles(uploadDir);
@@ -4031,7 +4194,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.delete("/api/system/uploads/:filename", isAdmin, async (req, res, next) => {
     try {
       const { filename } = req.params;
-      const uploadDir = process.env.UPLOAD_DIR || './uploads';
+      const uploadDir = config.uploadDir;
       
       console.log(`[DELETE] Attempting to delete file: ${filename}`);
       console.log(`[DELETE] Upload directory: ${uploadDir}`);
@@ -4074,30 +4237,46 @@ export async function registerRoutes(app: Express): Promise<Server> {
         }
       }
       
-      // Look for any database entries that reference this file
-      const allFiles = await storage.getAllFiles();
-      const matchingFiles = allFiles.filter(file => 
-        (file.filePath && file.filePath.includes(sanitizedFilename)) || 
-        file.filename === sanitizedFilename
-      );
-      
-      console.log(`[DELETE] Found ${matchingFiles.length} database references to file ${sanitizedFilename}`);
-      
-      // Mark matching files as unavailable in the database
-      if (matchingFiles.length > 0) {
-        for (const file of matchingFiles) {
-          console.log(`[DELETE] Marking file ID ${file.id} as unavailable`);
-          await storage.updateFile(file.id, { isAvailable: false });
+      // Hold the path's lock so an upload cannot be handed this stored file (or register a record
+      // for it) between looking up its references and removing it
+      const outcome = await withPathLocks([filePath], async () => {
+        if (hasPendingClaim(filePath)) return null;
+
+        // Look for any database entries that reference this file
+        const allFiles = await storage.getAllFiles();
+        const matchingFiles = allFiles.filter(file => 
+          (file.filePath && file.filePath.includes(sanitizedFilename)) || 
+          file.filename === sanitizedFilename
+        );
+        
+        console.log(`[DELETE] Found ${matchingFiles.length} database references to file ${sanitizedFilename}`);
+        
+        // Mark matching files as unavailable in the database
+        if (matchingFiles.length > 0) {
+          console.log(`[DELETE] Marking file IDs ${matchingFiles.map(file => file.id).join(', ')} as unavailable`);
+          await storage.setFilesAvailability(matchingFiles.map(file => file.id), false);
+        }
+        
+        // Delete the physical file with better error handling
+        let deleteError: unknown = null;
+        try {
+          console.log(`[DELETE] Attempting to delete physical file at: ${filePath}`);
+          await fileSystem.deleteFile(filePath);
+          console.log(`[DELETE] Physical file deleted successfully`);
+        } catch (error) {
+          console.error(`[DELETE ERROR] Failed to delete physical file:`, error);
+          deleteError = error;
         }
+        return { matchingFiles, deleteError };
+      });
+      
+      if (!outcome) {
+        console.log(`[DELETE] File ${filePath} is claimed by an upload in progress`);
+        return res.status(409).json({ message: "File is being used by an upload in progress, try again later" });
       }
       
-      // Delete the physical file with better error handling
-      try {
-        console.log(`[DELETE] Attempting to delete physical file at: ${filePath}`);
-        await fileSystem.deleteFile(filePath);
-        console.log(`[DELETE] Physical file deleted successfully`);
-      } catch (deleteError) {
-        console.error(`[DELETE ERROR] Failed to delete physical file:`, deleteError);
+      const { matchingFiles, deleteError } = outcome;
+      if (deleteError) {
         // Continue even if physical file deletion fails, but with warning
         return res.status(207).json({
           message: "Database updated but failed to delete physical file",
@@ -4144,22 +4323,14 @@ export async function registerRoutes(app: Express): Promise<Server> {
     try {
       const activities = await storage.getAllActivities();
       
-      // Get user details for each activity
-      const activitiesWithUsers = await Promise.all(
-        activities.map(async (activity) => {
-          const user = await storage.getUser(activity.userId);
-          
-          if (!user) return activity;
-          
-          // Remove password from user object
-          const { password, ...userWithoutPassword } = user;
-          
-          return {
-            ...activity,
-            user: userWithoutPassword,
-          };
-        })
-      );
+      // Get user details for all activities in one query
+      const users = await storage.getUsersByIds(activities.map(activity => activity.userId));
+      const usersById = new Map(users.map(user => [user.id, user]));
+      
+      const activitiesWithUsers = activities.map(activity => {
+        const user = usersById.get(activity.userId);
+        return user ? { ...activity, user } : activity;
+      });
       
       res.json(activitiesWithUsers);
     } catch (error) {
@@ -4173,22 +4344,14 @@ export async function registerRoutes(app: Express): Promise<Server> {
       const projectId = parseInt(req.params.projectId);
       const activities = await storage.getActivitiesByProject(projectId);
       
-      // Get user details for each activity
-      const activitiesWithUsers = await Promise.all(
-        activities.map(async (activity) => {
-          const user = await storage.getUser(activity.userId);
-          
-          if (!user) return activity;
-          
-          // Remove password from user object
-          const { password, ...userWithoutPassword } = user;
-          
-          return {
-            ...activity,
-            user: userWithoutPassword,
-          };
-        })
-      );
+      // Get user details for all activities in one query
+      const users = await storage.getUsersByIds(activities.map(activity => activity.userId));
+      const usersById = new Map(users.map(user => [user.id, user]));
+      
+      const activitiesWithUsers = activities.map(activity => {
+        const user = usersById.get(activity.userId);
+        return user ? { ...activity, user } : activity;
+      });
       
       res.json(activitiesWithUsers);
     } catch (error) {
@@ -4238,7 +4401,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         // Check if user has edit access to the project
         if (req.user.role !== "admin") {
           console.log(`User role is not admin, checking project-specific permissions`);
-          const projectUser = await storage.getProjectUser(parseInt(projectId), req.user.id);
+          const projectUser = await getRequestProjectUser(req, parseInt(projectId));
           if (!projectUser || !["admin", "editor"].includes(projectUser.role)) {
             console.error(`User ${req.user.id} does not have permission to invite users to project ${projectId}`);
             return res.status(403).json({ message: "You don't have permission to invite users to this project" });
@@ -4323,7 +4486,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // If SendGrid API key is available, send an email
       let emailSent = false;
       console.log(`Checking SendGrid API key availability for invitation to ${email}`);
-      console.log(`API Key: SENDGRID_API_KEY ${process.env.SENDGRID_API_KEY ? 'is set' : 'is NOT set'}`);
+      console.log(`API Key: SENDGRID_API_KEY ${config.sendgridApiKey ? 'is set' : 'is NOT set'}`);
       
       // For project-specific invitations, get the project
       let projectObj;
@@ -4331,7 +4494,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         projectObj = await storage.getProject(parseInt(projectId));
       }
       
-      if (process.env.SENDGRID_API_KEY) {
+      if (config.sendgridApiKey) {
         console.log(`SendGrid API key is available, preparing to send invitation email to ${email}`);
         try {
           // Import the sendInvitationEmail function from utils/sendgrid
@@ -4585,7 +4748,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       const emailSent = await sendEmail({
         to: to,
-        from: process.env.EMAIL_FROM || 'alerts@obedtv.com',
+        from: config.emailFrom,
         subject: 'Test Email from ObedTV',
         text: 'This is a test email sent directly from the /api/debug/send-test-email endpoint.',
         html: '<p>This is a test email sent directly from the <code>/api/debug/send-test-email</code> endpoint.</p>'
@@ -4595,15 +4758,15 @@ export async function registerRoutes(app: Express): Promise<Server> {
         res.json({ 
           success: true, 
           message: `Test email sent to ${to}. Check the logs for details.`,
-          apiKey: process.env.SENDGRID_API_KEY ? "API key is set" : "API key is missing",
-          sandboxMode: process.env.SENDGRID_SANDBOX === 'true' ? "enabled" : "disabled" 
+          apiKey: config.sendgridApiKey ? "API key is set" : "API key is missing",
+          sandboxMode: config.sendgridSandbox ? "enabled" : "disabled" 
         });
       } else {
         res.status(500).json({ 
           success: false, 
           message: `Failed to send test email to ${to}. Check the logs for details.`,
-          apiKey: process.env.SENDGRID_API_KEY ? "API key is set" : "API key is missing",
-          sandboxMode: process.env.SENDGRID_SANDBOX === 'true' ? "enabled" : "disabled"
+          apiKey: config.sendgridApiKey ? "API key is set" : "API key is missing",
+          sandboxMode: config.sendgridSandbox ? "enabled" : "disabled"
         });
       }
     } catch (error) {
@@ -4745,7 +4908,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         // Check if the user is the creator of the invitation
         if (invitation.createdById !== req.user.id) {
           // Check if the user has edit access to the project
-          const projectUser = await storage.getProjectUser(invitation.projectId, req.user.id);
+          const projectUser = await getRequestProjectUser(req, invitation.projectId);
           if (!projectUser || !["admin", "editor"].includes(projectUser.role)) {
             return res.status(403).json({ message: "You don't have permission to cancel this invitation" });
           }
@@ -4825,7 +4988,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         if (invitation.createdById !== req.user.id) {
           console.log(`User ${req.user.id} is not the creator of this invitation, checking project permissions`);
           // Check if the user has edit access to the project
-          const projectUser = await storage.getProjectUser(invitation.projectId, req.user.id);
+          const projectUser = await getRequestProjectUser(req, invitation.projectId);
           if (!projectUser || !["admin", "editor"].includes(projectUser.role)) {
             console.error(`User ${req.user.id} does not have permission to resend invitation ${invitationId}`);
             return res.status(403).json({ message: "You don't have permission to resend this invitation" });
@@ -4844,9 +5007,9 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // If SendGrid API key is available, send the email
       let emailSent = false;
       console.log(`Attempting to resend invitation email to ${invitation.email}`);
-      console.log(`API Key: SENDGRID_API_KEY ${process.env.SENDGRID_API_KEY ? 'is set' : 'is NOT set'}`);
+      console.log(`API Key: SENDGRID_API_KEY ${config.sendgridApiKey ? 'is set' : 'is NOT set'}`);
       
-      if (process.env.SENDGRID_API_KEY) {
+      if (config.sendgridApiKey) {
         console.log(`SendGrid API key is available, preparing to resend invitation email`);
         try {
           if (inviter) {
@@ -4985,27 +5148,17 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       console.log("Project users:", projectUsers);
       
-      // Get user details for each project user
-      const teamMembers = await Promise.all(
-        projectUsers.map(async (projectUser) => {
-          const user = await storage.getUser(projectUser.userId);
-          
-          console.log("Project user ID:", projectUser.userId, "User:", user);
-          
-          if (!user) return null;
-          
-          // Remove password from user object
-          const { password, ...userWithoutPassword } = user;
-          
-          return {
-            ...projectUser,
-            user: userWithoutPassword,
-          };
-        })
-      );
+      // Get user details for all project users in one query
+      const users = await storage.getUsersByIds(projectUsers.map(projectUser => projectUser.userId));
+      const usersById = new Map(users.map(user => [user.id, user]));
       
-      // Filter out any null values
-      const validTeamMembers = teamMembers.filter(member => member !== null);
+      // Skip project users whose account no longer exists
+      const validTeamMembers = projectUsers
+        .filter(projectUser => usersById.has(projectUser.userId))
+        .map(projectUser => ({
+          ...projectUser,
+          user: usersById.get(projectUser.userId),
+        }));
       
       console.log("Valid team members:", validTeamMembers);
       
@@ -5024,22 +5177,14 @@ export async function registerRoutes(app: Express): Promise<Server> {
       // Get all invitations for this project using the storage interface
       const pendingInvitations = await storage.getInvitationsByProject(projectId);
       
-      // Get creator details for each invitation
-      const invitationsWithCreators = await Promise.all(
-        pendingInvitations.map(async (invitation) => {
-          const creator = await storage.getUser(invitation.createdById);
-          
-          if (!creator) return invitation;
-          
-          // Remove password from creator object
-          const { password, ...creatorWithoutPassword } = creator;
-          
-          return {
-            ...invitation,
-            creator: creatorWithoutPassword,
-          };
-        })
-      );
+      // Get creator details for all invitations in one query
+      const creators = await storage.getUsersByIds(pendingInvitations.map(invitation => invitation.createdById));
+      const creatorsById = new Map(creators.map(creator => [creator.id, creator]));
+      
+      const invitationsWithCreators = pendingInvitations.map(invitation => {
+        const creator = creatorsById.get(invitation.createdById);
+        return creator ? { ...invitation, creator } : invitation;
+      });
       
       res.json(invitationsWithCreators);
     } catch (error) {
@@ -5052,37 +5197,11 @@ export async function registerRoutes(app: Express): Promise<Server> {
     try {
       const projectId = parseInt(req.params.projectId);
       
-      // Get all files for this project
-      const files = await storage.getFilesByProject(projectId);
-      
-      if (!files || files.length === 0) {
-        return res.json([]);
-      }
-      
-      // Get all comments for all files in project
-      const allComments = [];
+      // Get the comments of every file in the project along with their file
+      const projectComments = await storage.getUnifiedCommentsByProject(projectId);
       
-      for (const file of files) {
-        // Get unified comments (includes both regular and public comments)
-        const fileComments = await storage.getUnifiedCommentsByFileV2(file.id);
-        
-        if (fileComments && fileComments.length > 0) {
-          // Add file info to each comment and strip creatorToken for security
-          const commentsWithFile = fileComments.map((comment) => {
-            const { creatorToken, ...sanitizedComment } = comment;
-            return {
-              ...sanitizedComment,
-              file: {
-                id: file.id,
-                filename: file.filename,
-                fileType: file.fileType
-              }
-            };
-          });
-          
-          allComments.push(...commentsWithFile);
-        }
-      }
+      // Strip creatorToken for security
+      const allComments = projectComments.map(({ creatorToken, ...sanitizedComment }) => sanitizedComment);
       
       // Sort comments by date (newest first)
       const sortedComments = allComments.sort((a, b) => 
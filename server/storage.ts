@@ -14,6 +14,7 @@ import {
   passwordResets,
   videoProcessing,
   type User,
+  type SafeUser,
   type InsertUser,
   type Folder,
   type InsertFolder,
@@ -28,6 +29,7 @@ import {
   type UnifiedComment,
   type CommentUnified,
   type InsertCommentUnified,
+  type ProjectComment,
   type CommentReaction,
   type InsertCommentReaction,
   type ProjectUser,
@@ -45,19 +47,32 @@ import {
 } from "@shared/schema";
 import createMemoryStore from "memorystore";
 import session from "express-session";
-import connectPg from "connect-pg-simple";
-import { eq, and, desc, sql } from "drizzle-orm";
-import { db, pool } from "./db";
+import { eq, and, or, desc, sql, inArray } from "drizzle-orm";
+import { db } from "./db";
+import { config } from "./utils/config";
 
 const MemoryStore = createMemoryStore(session);
-const PostgresSessionStore = connectPg(session);
+
+// Column selection for users that never reads the password hash
+const safeUserColumns = {
+  id: users.id,
+  username: users.username,
+  email: users.email,
+  name: users.name,
+  role: users.role,
+  themePreference: users.themePreference,
+  createdAt: users.createdAt,
+};
 
 export interface IStorage {
   // User management
   getUser(id: number): Promise<User | undefined>;
+  getSafeUser(id: number): Promise<SafeUser | undefined>;
   getUserByUsername(username: string): Promise<User | undefined>;
   getUserByEmail(email: string): Promise<User | undefined>;
-  getAllUsers(): Promise<User[]>;
+  getUsersByUsernameOrEmail(username: string, email: string): Promise<User[]>;
+  getAllUsers(): Promise<SafeUser[]>;
+  getUsersByIds(ids: number[]): Promise<SafeUser[]>;
   createUser(user: InsertUser): Promise<User>;
   updateUser(id: number, data: Partial<InsertUser>): Promise<User | undefined>;
   deleteUser(id: number): Promise<boolean>;
@@ -83,10 +98,13 @@ export interface IStorage {
 
   // File management
   getFile(id: number): Promise<File | undefined>;
+  getFileWithProjectUser(fileId: number, userId: number): Promise<{ file: File; projectUser: ProjectUser | null } | undefined>;
   getFilesByProject(projectId: number): Promise<File[]>;
   getAllFiles(): Promise<File[]>;
+  getFilesByPaths(filePaths: string[]): Promise<File[]>;
   createFile(file: InsertFile): Promise<File>;
   updateFile(id: number, data: Partial<InsertFile>): Promise<File | undefined>;
+  setFilesAvailability(ids: number[], isAvailable: boolean): Promise<number>;
   deleteFile(id: number): Promise<boolean>;
   
   // Video processing management
@@ -97,6 +115,7 @@ export interface IStorage {
   // New Unified Comment management (UUID-based) 
   getUnifiedComment(id: string): Promise<CommentUnified | undefined>;
   getUnifiedCommentsByFileV2(fileId: number): Promise<CommentUnified[]>;
+  getUnifiedCommentsByProject(projectId: number): Promise<ProjectComment[]>;
   getUnifiedReplies(parentId: string): Promise<CommentUnified[]>;
   createUnifiedComment(comment: InsertCommentUnified): Promise<CommentUnified>;
   updateUnifiedComment(id: string, data: Partial<InsertCommentUnified>): Promise<CommentUnified | undefined>;
@@ -146,6 +165,7 @@ export interface IStorage {
   getApprovalsByFile(fileId: number): Promise<Approval[]>;
   getApprovalByUserAndFile(userId: number, fileId: number): Promise<Approval | undefined>;
   updateApproval(id: number, data: Partial<InsertApproval>): Promise<Approval | undefined>;
+  upsertApproval(approval: InsertApproval): Promise<Approval>;
   
   // Password Reset
   createPasswordReset(passwordReset: InsertPasswordReset): Promise<PasswordReset>;
@@ -159,9 +179,6 @@ export interface IStorage {
   getCommentReactions(commentId: string): Promise<{ reactionType: string; count: number; userReacted?: boolean }[]>;
   getCommentReactionsWithUserStatus(commentId: string, userId?: number, creatorToken?: string): Promise<{ reactionType: string; count: number; userReacted: boolean }[]>;
   getCommentReactionsWithUsers(commentId: string, userId?: number, creatorToken?: string): Promise<{ reactionType: string; count: number; userReacted: boolean; users: { name: string; isCurrentUser: boolean }[] }[]>;
-
-  // Session store
-  sessionStore: any; // Using any to avoid type issues
 }
 
 export class MemStorage implements IStorage {
@@ -231,6 +248,13 @@ export class MemStorage implements IStorage {
     return this.users.get(id);
   }
 
+  async getSafeUser(id: number): Promise<SafeUser | undefined> {
+    const user = this.users.get(id);
+    if (!user) return undefined;
+    const { password, ...userWithoutPassword } = user;
+    return userWithoutPassword;
+  }
+
   async getUserByUsername(username: string): Promise<User | undefined> {
     return Array.from(this.users.values()).find(
       (user) => user.username === username,
@@ -243,8 +267,26 @@ export class MemStorage implements IStorage {
     );
   }
 
-  async getAllUsers(): Promise<User[]> {
-    return Array.from(this.users.values());
+  async getUsersByUsernameOrEmail(username: string, email: string): Promise<User[]> {
+    return Array.from(this.users.values()).filter(
+      (user) => user.username === username || user.email === email,
+    );
+  }
+
+  async getAllUsers(): Promise<SafeUser[]> {
+    return Array.from(this.users.values()).map(({ password, ...userWithoutPassword }) => userWithoutPassword);
+  }
+
+  async getUsersByIds(ids: number[]): Promise<SafeUser[]> {
+    const result: SafeUser[] = [];
+    for (const id of Array.from(new Set(ids))) {
+      const user = this.users.get(id);
+      if (user) {
+        const { password, ...userWithoutPassword } = user;
+        result.push(userWithoutPassword);
+      }
+    }
+    return result;
   }
 
   async createUser(insertUser: InsertUser): Promise<User> {
@@ -418,6 +460,13 @@ export class MemStorage implements IStorage {
     return this.files.get(id);
   }
 
+  async getFileWithProjectUser(fileId: number, userId: number): Promise<{ file: File; projectUser: ProjectUser | null } | undefined> {
+    const file = this.files.get(fileId);
+    if (!file) return undefined;
+    const projectUser = await this.getProjectUser(file.projectId, userId);
+    return { file, projectUser: projectUser || null };
+  }
+
   async getFilesByProject(projectId: number): Promise<File[]> {
     return Array.from(this.files.values()).filter(
       (file) => file.projectId === projectId
@@ -428,6 +477,11 @@ export class MemStorage implements IStorage {
     return Array.from(this.files.values());
   }
 
+  async getFilesByPaths(filePaths: string[]): Promise<File[]> {
+    const pathSet = new Set(filePaths);
+    return Array.from(this.files.values()).filter((file) => pathSet.has(file.filePath));
+  }
+
   async createFile(insertFile: InsertFile): Promise<File> {
     const id = this.currentFileId++;
     const now = new Date();
@@ -449,6 +503,17 @@ export class MemStorage implements IStorage {
     return updatedFile;
   }
 
+  async setFilesAvailability(ids: number[], isAvailable: boolean): Promise<number> {
+    let updated = 0;
+    for (const id of Array.from(new Set(ids))) {
+      const file = this.files.get(id);
+      if (!file) continue;
+      this.files.set(id, { ...file, isAvailable });
+      updated++;
+    }
+    return updated;
+  }
+
   async deleteFile(id: number): Promise<boolean> {
     return this.files.delete(id);
   }
@@ -987,6 +1052,16 @@ export class MemStorage implements IStorage {
     return updatedApproval;
   }
 
+  async upsertApproval(insertApproval: InsertApproval): Promise<Approval> {
+    const existing = await this.getApprovalByUserAndFile(insertApproval.userId, insertApproval.fileId);
+    if (existing) {
+      const updatedApproval: Approval = { ...existing, ...insertApproval };
+      this.approvals.set(existing.id, updatedApproval);
+      return updatedApproval;
+    }
+    return this.createApproval(insertApproval);
+  }
+
   // Password Reset methods
   async createPasswordReset(insertPasswordReset: InsertPasswordReset): Promise<PasswordReset> {
     const id = this.currentPasswordResetId++;
@@ -1059,6 +1134,18 @@ export class MemStorage implements IStorage {
     return comments.sort((a, b) => new Date(a.createdAt).getTime() - new Date(b.createdAt).getTime());
   }
 
+  async getUnifiedCommentsByProject(projectId: number): Promise<ProjectComment[]> {
+    const projectFiles = await this.getFilesByProject(projectId);
+    const result: ProjectComment[] = [];
+    for (const file of projectFiles) {
+      const fileComments = await this.getUnifiedCommentsByFileV2(file.id);
+      for (const comment of fileComments) {
+        result.push({ ...comment, file: { id: file.id, filename: file.filename, fileType: file.fileType } });
+      }
+    }
+    return result;
+  }
+
   async getUnifiedReplies(parentId: string): Promise<CommentUnified[]> {
     return Array.from(this.unifiedComments.values()).filter(
       (comment) => comment.parentId === parentId
@@ -1240,15 +1327,11 @@ export class MemStorage implements IStorage {
   }
 }
 
+// Sessions are persisted by the PostgreSQL session store configured in auth.ts
 export class DatabaseStorage implements IStorage {
-  sessionStore: any; // Using any to avoid type issues
-
-  constructor() {
-    // Session store initialization moved to auth.ts for proper persistence
-    this.sessionStore = new PostgresSessionStore({
-      pool
-    });
-  }
+  // Session users are resolved on every authenticated request; keep them briefly so a page that
+  // fires several API calls at once doesn't load the same user for each. Writes invalidate.
+  private safeUserCache = new Map<number, { user: SafeUser; expiresAt: number }>();
 
   // User methods
   async getUser(id: number): Promise<User | undefined> {
@@ -1256,6 +1339,23 @@ export class DatabaseStorage implements IStorage {
     return user;
   }
 
+  // Load a user without the password hash (used for the session user)
+  async getSafeUser(id: number): Promise<SafeUser | undefined> {
+    const cached = this.safeUserCache.get(id);
+    if (cached && cached.expiresAt > Date.now()) {
+      return cached.user;
+    }
+
+    const [user] = await db.select(safeUserColumns).from(users).where(eq(users.id, id));
+    if (user && config.sessionUserCacheTtlMs > 0) {
+      if (this.safeUserCache.size >= 10000) this.safeUserCache.clear();
+      this.safeUserCache.set(id, { user, expiresAt: Date.now() + config.sessionUserCacheTtlMs });
+    } else {
+      this.safeUserCache.delete(id);
+    }
+    return user;
+  }
+
   async getUserByUsername(username: string): Promise<User | undefined> {
     const [user] = await db.select().from(users).where(eq(users.username, username));
     return user;
@@ -1266,8 +1366,27 @@ export class DatabaseStorage implements IStorage {
     return user;
   }
 
-  async getAllUsers(): Promise<User[]> {
-    return await db.select().from(users);
+  // Users matching either the username or the email, fetched in a single round trip
+  async getUsersByUsernameOrEmail(username: string, email: string): Promise<User[]> {
+    return await db
+      .select()
+      .from(users)
+      .where(or(eq(users.username, username), eq(users.email, email)));
+  }
+
+  async getAllUsers(): Promise<SafeUser[]> {
+    return await db.select(safeUserColumns).from(users);
+  }
+
+  // Batch-load users for list endpoints in a single IN (...) query instead of one query per row
+  async getUsersByIds(ids: number[]): Promise<SafeUser[]> {
+    const uniqueIds = Array.from(new Set(ids));
+    if (uniqueIds.length === 0) return [];
+
+    return await db
+      .select(safeUserColumns)
+      .from(users)
+      .where(inArray(users.id, uniqueIds));
   }
 
   async createUser(insertUser: InsertUser): Promise<User> {
@@ -1281,10 +1400,12 @@ export class DatabaseStorage implements IStorage {
       .set(data)
       .where(eq(users.id, id))
       .returning();
+    this.safeUserCache.delete(id);
     return updatedUser;
   }
 
   async deleteUser(id: number): Promise<boolean> {
+    this.safeUserCache.delete(id);
     const result = await db
       .delete(users)
       .where(eq(users.id, id))
@@ -1389,49 +1510,35 @@ export class DatabaseStorage implements IStorage {
   }
 
   async getAllProjectsWithLatestVideo(): Promise<(Project & { latestVideoFile?: File })[]> {
-    const allProjects = await db.select().from(projects);
-    
-    const projectsWithVideo = await Promise.all(allProjects.map(async (project) => {
-      const latestVideoFiles = await db
-        .select()
-        .from(files)
-        .where(and(eq(files.projectId, project.id), eq(files.fileType, 'video')))
-        .orderBy(desc(files.createdAt))
-        .limit(1);
-      
-      return {
-        ...project,
-        latestVideoFile: latestVideoFiles[0] || undefined
-      };
-    }));
-    
-    return projectsWithVideo;
+    const rows: (Project & { files: File[] })[] = await db.query.projects.findMany({
+      with: { files: this.latestVideoOfProject() }
+    });
+    return rows.map(this.withLatestVideo);
   }
 
   async getProjectsByUserWithLatestVideo(userId: number): Promise<(Project & { latestVideoFile?: File })[]> {
-    const userProjects = await db
-      .select({
-        project: projects
-      })
-      .from(projectUsers)
-      .where(eq(projectUsers.userId, userId))
-      .innerJoin(projects, eq(projectUsers.projectId, projects.id));
+    const memberships: { project: Project & { files: File[] } }[] = await db.query.projectUsers.findMany({
+      columns: {},
+      where: eq(projectUsers.userId, userId),
+      with: { project: { with: { files: this.latestVideoOfProject() } } }
+    });
+    return memberships.map(({ project }) => this.withLatestVideo(project));
+  }
 
-    const projectsWithVideo = await Promise.all(userProjects.map(async (up) => {
-      const latestVideoFiles = await db
-        .select()
-        .from(files)
-        .where(and(eq(files.projectId, up.project.id), eq(files.fileType, 'video')))
-        .orderBy(desc(files.createdAt))
-        .limit(1);
-      
-      return {
-        ...up.project,
-        latestVideoFile: latestVideoFiles[0] || undefined
-      };
-    }));
-    
-    return projectsWithVideo;
+  // Newest video of each loaded project, so the dashboard is one query instead of one per project.
+  // Drizzle compiles this to a LEFT JOIN LATERAL (... WHERE project_id = <project> AND
+  // file_type = 'video' ORDER BY created_at DESC LIMIT 1) per returned project, served by
+  // idx_files_project_latest_video, so the cost follows the projects returned, not the files table.
+  private latestVideoOfProject() {
+    return {
+      where: eq(files.fileType, 'video'),
+      orderBy: [desc(files.createdAt)],
+      limit: 1
+    };
+  }
+
+  private withLatestVideo({ files: latestVideos, ...project }: Project & { files: File[] }): Project & { latestVideoFile?: File } {
+    return { ...project, latestVideoFile: latestVideos[0] };
   }
 
   // File methods
@@ -1440,6 +1547,23 @@ export class DatabaseStorage implements IStorage {
     return file;
   }
 
+  // Loads a file together with the given user's membership in the file's project in one query
+  async getFileWithProjectUser(fileId: number, userId: number): Promise<{ file: File; projectUser: ProjectUser | null } | undefined> {
+    const [row] = await db
+      .select()
+      .from(files)
+      .leftJoin(
+        projectUsers,
+        and(
+          eq(projectUsers.projectId, files.projectId),
+          eq(projectUsers.userId, userId)
+        )
+      )
+      .where(eq(files.id, fileId));
+    if (!row) return undefined;
+    return { file: row.files, projectUser: row.project_users };
+  }
+
   async getFilesByProject(projectId: number): Promise<File[]> {
     return await db.select().from(files).where(eq(files.projectId, projectId));
   }
@@ -1448,6 +1572,14 @@ export class DatabaseStorage implements IStorage {
     return await db.select().from(files);
   }
 
+  // Files stored at any of the given paths (deduplicated uploads share a path)
+  async getFilesByPaths(filePaths: string[]): Promise<File[]> {
+    const uniquePaths = Array.from(new Set(filePaths));
+    if (uniquePaths.length === 0) return [];
+
+    return await db.select().from(files).where(inArray(files.filePath, uniquePaths));
+  }
+
   async createFile(insertFile: InsertFile): Promise<File> {
     const [file] = await db.insert(files).values(insertFile).returning();
     return file;
@@ -1462,6 +1594,19 @@ export class DatabaseStorage implements IStorage {
     return updatedFile;
   }
 
+  // Mark many files available or unavailable with a single UPDATE; returns the number of rows changed
+  async setFilesAvailability(ids: number[], isAvailable: boolean): Promise<number> {
+    const uniqueIds = Array.from(new Set(ids));
+    if (uniqueIds.length === 0) return 0;
+
+    const updated = await db
+      .update(files)
+      .set({ isAvailable })
+      .where(inArray(files.id, uniqueIds))
+      .returning({ id: files.id });
+    return updated.length;
+  }
+
   async deleteFile(id: number): Promise<boolean> {
     const result = await db
       .delete(files)
@@ -1916,6 +2061,22 @@ export class DatabaseStorage implements IStorage {
     return updatedApproval;
   }
 
+  // Create the user's approval for a file, or replace it if one exists, in a single statement
+  async upsertApproval(insertApproval: InsertApproval): Promise<Approval> {
+    const [approval] = await db
+      .insert(approvals)
+      .values(insertApproval)
+      .onConflictDoUpdate({
+        target: [approvals.fileId, approvals.userId],
+        set: {
+          status: insertApproval.status,
+          feedback: insertApproval.feedback ?? null
+        }
+      })
+      .returning();
+    return approval;
+  }
+
   // Password Reset methods
   async createPasswordReset(insertPasswordReset: InsertPasswordReset): Promise<PasswordReset> {
     const [passwordReset] = await db
@@ -2273,6 +2434,25 @@ export class DatabaseStorage implements IStorage {
     return comments;
   }
 
+  // Comments on every file of a project, loaded with their files through the files relation
+  // in a single relational query rather than one query per file
+  async getUnifiedCommentsByProject(projectId: number): Promise<ProjectComment[]> {
+    const projectFiles: Array<Pick<File, "id" | "filename" | "fileType"> & { unifiedComments: CommentUnified[] }> =
+      await db.query.files.findMany({
+        columns: { id: true, filename: true, fileType: true },
+        where: eq(files.projectId, projectId),
+        with: {
+          unifiedComments: {
+            orderBy: [commentsUnified.createdAt]
+          }
+        }
+      });
+
+    return projectFiles.flatMap(({ unifiedComments, ...file }) =>
+      unifiedComments.map((comment) => ({ ...comment, file }))
+    );
+  }
+
   async getUnifiedReplies(parentId: string): Promise<CommentUnified[]> {
     return await db
       .select()
@@ -0,0 +1,11 @@
+import express, { type RequestHandler } from 'express';
+import { config } from './config';
+
+// Only JSON and form bodies are parsed into memory; file uploads stream to disk through multer,
+// so both parsers are capped at config.maxRequestBodySize
+export function bodyParsers(options: { extended: boolean }): RequestHandler[] {
+  return [
+    express.json({ limit: config.maxRequestBodySize }),
+    express.urlencoded({ extended: options.extended, limit: config.maxRequestBodySize }),
+  ];
+}
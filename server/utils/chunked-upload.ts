@@ -0,0 +1,231 @@
+import * as fs from 'fs';
+import path from 'path';
+import { createHash, randomUUID } from 'crypto';
+import { pipeline, Transform, type Readable } from 'stream';
+import { UPLOAD_WRITE_BUFFER_SIZE, contentAddressedFilename, storeByContentHash } from './upload-storage';
+
+// Chunk size suggested to clients. Chunks may be sent in parallel and in any order.
+export const CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+
+// Smallest chunk accepted, except for the one ending the file. Together with merging received
+// ranges this bounds the bookkeeping per upload regardless of how a client slices the file.
+export const CHUNKED_UPLOAD_MIN_CHUNK_SIZE = 1024 * 1024;
+
+// Uploads that receive no chunk for this long are discarded along with their partial data
+const STALE_UPLOAD_TTL_MS = 24 * 60 * 60 * 1000;
+
+export interface ChunkedUpload {
+  id: string;
+  projectId: number;
+  userId: number;
+  originalname: string;
+  mimetype: string;
+  customFilename?: string;
+  size: number;
+  // Directory the completed upload is stored in (the temporary file lives in a subdirectory)
+  uploadsDir: string;
+  tempPath: string;
+  // Received byte ranges [start, end), sorted and merged so overlapping or adjacent chunks
+  // collapse into one entry
+  received: Array<{ start: number; end: number }>;
+  receivedBytes: number;
+  updatedAt: number;
+  // Set while the upload is being hashed and stored, so it is finalized only once
+  completing: boolean;
+}
+
+export interface ContentRange {
+  start: number;
+  end: number;
+  total: number;
+}
+
+// In-progress uploads live in memory; a restart drops them and clients start over
+const uploads = new Map<string, ChunkedUpload>();
+
+// Partial files are kept in a dot-prefixed subdirectory of the uploads directory, which the
+// admin orphan cleanup and other uploads-root sweeps skip
+const TEMP_DIRECTORY_NAME = '.chunked';
+
+/**
+ * Start a chunked upload, reserving a temporary file under the uploads directory
+ */
+export async function createChunkedUpload(
+  uploadsDir: string,
+  params: Pick<ChunkedUpload, 'projectId' | 'userId' | 'originalname' | 'mimetype' | 'customFilename' | 'size'>
+): Promise<ChunkedUpload> {
+  const id = randomUUID();
+  const tempDir = path.join(uploadsDir, TEMP_DIRECTORY_NAME);
+  await fs.promises.mkdir(tempDir, { recursive: true });
+  const tempPath = path.join(tempDir, `${id}.part`);
+  await fs.promises.writeFile(tempPath, '');
+
+  const upload: ChunkedUpload = {
+    ...params,
+    id,
+    uploadsDir,
+    tempPath,
+    received: [],
+    receivedBytes: 0,
+    updatedAt: Date.now(),
+    completing: false
+  };
+  uploads.set(id, upload);
+  return upload;
+}
+
+export function getChunkedUpload(id: string): ChunkedUpload | undefined {
+  return uploads.get(id);
+}
+
+/**
+ * Parse a "bytes start-end/total" Content-Range header
+ */
+export function parseContentRange(header: string | undefined): ContentRange | null {
+  const match = header?.match(/^bytes (\d+)-(\d+)\/(\d+)$/);
+  if (!match) return null;
+
+  const [start, end, total] = match.slice(1).map(Number);
+  if (start > end || end >= total) return null;
+  return { start, end, total };
+}
+
+/**
+ * Number of bytes received without gaps from the start of the file (the resume offset)
+ */
+export function getContiguousOffset(upload: ChunkedUpload): number {
+  const first = upload.received[0];
+  return first && first.start === 0 ? first.end : 0;
+}
+
+/**
+ * Whether a chunk is large enough to accept: at least the minimum size unless it ends the file
+ */
+export function isAcceptableChunkSize(range: ContentRange): boolean {
+  return range.end - range.start + 1 >= CHUNKED_UPLOAD_MIN_CHUNK_SIZE || range.end === range.total - 1;
+}
+
+// Add [start, end) to the merged received ranges and recount the received bytes
+function recordReceivedRange(upload: ChunkedUpload, start: number, end: number) {
+  const merged: Array<{ start: number; end: number }> = [];
+  let current = { start, end };
+  for (const range of upload.received) {
+    if (range.end < current.start || range.start > current.end) {
+      merged.push(range);
+    } else {
+      current = { start: Math.min(range.start, current.start), end: Math.max(range.end, current.end) };
+    }
+  }
+  merged.push(current);
+  merged.sort((a, b) => a.start - b.start);
+
+  upload.received = merged;
+  upload.receivedBytes = merged.reduce((total, range) => total + range.end - range.start, 0);
+}
+
+export function isChunkedUploadComplete(upload: ChunkedUpload): boolean {
+  return getContiguousOffset(upload) >= upload.size;
+}
+
+/**
+ * Pass through at most `limit` bytes, failing (without writing the excess) if the body is longer
+ */
+function limitBytes(limit: number): Transform {
+  let seen = 0;
+  return new Transform({
+    transform(chunk: Buffer, _encoding, callback) {
+      seen += chunk.length;
+      if (seen > limit) {
+        return callback(new Error(`Chunk body exceeds Content-Range length ${limit}`));
+      }
+      callback(null, chunk);
+    }
+  });
+}
+
+/**
+ * Write one chunk of the upload at its offset in the temporary file. Bytes outside the
+ * chunk's Content-Range are never written, so a bad request cannot corrupt other chunks.
+ */
+export function writeChunk(upload: ChunkedUpload, body: Readable, range: ContentRange): Promise<void> {
+  const expectedLength = range.end - range.start + 1;
+  const outStream = fs.createWriteStream(upload.tempPath, {
+    flags: 'r+',
+    start: range.start,
+    highWaterMark: UPLOAD_WRITE_BUFFER_SIZE
+  });
+
+  return new Promise((resolve, reject) => {
+    pipeline(body, limitBytes(expectedLength), outStream, (error) => {
+      if (error) return reject(error);
+      if (outStream.bytesWritten !== expectedLength) {
+        return reject(new Error(`Chunk length ${outStream.bytesWritten} does not match Content-Range length ${expectedLength}`));
+      }
+
+      // Retried or overlapping chunks are merged rather than counted twice
+      recordReceivedRange(upload, range.start, range.end + 1);
+      upload.updatedAt = Date.now();
+      resolve();
+    });
+  });
+}
+
+/**
+ * Hash the assembled upload and move it to its content-addressed location.
+ * Returns null if another request already completed the upload.
+ */
+export async function completeChunkedUpload(
+  upload: ChunkedUpload
+): Promise<{ filename: string; path: string; size: number; created: boolean } | null> {
+  // Parallel final chunks can both see a complete upload; only the first one finalizes it
+  if (upload.completing || !uploads.has(upload.id)) return null;
+  upload.completing = true;
+
+  try {
+    // The assembled file must be exactly the declared size before it is hashed and stored
+    const { size } = await fs.promises.stat(upload.tempPath);
+    if (size < upload.size) {
+      throw new Error(`Chunked upload ${upload.id} has ${size} of ${upload.size} bytes on disk`);
+    }
+    if (size > upload.size) {
+      await fs.promises.truncate(upload.tempPath, upload.size);
+    }
+
+    // Chunks may arrive out of order, so the hash is computed once the file is whole
+    const hash = createHash('sha256');
+    for await (const chunk of fs.createReadStream(upload.tempPath, { highWaterMark: UPLOAD_WRITE_BUFFER_SIZE })) {
+      hash.update(chunk);
+    }
+
+    const filename = contentAddressedFilename(hash.digest('hex'), upload.originalname);
+    const stored = await storeByContentHash(upload.tempPath, upload.uploadsDir, filename);
+
+    // Only stop tracking the upload once it is stored; on failure it stays retryable and
+    // the stale-upload sweep still cleans up its partial data
+    uploads.delete(upload.id);
+    return { filename, path: stored.path, size: upload.size, created: stored.created };
+  } catch (error) {
+    upload.completing = false;
+    upload.updatedAt = Date.now();
+    throw error;
+  }
+}
+
+/**
+ * Abandon an upload and delete its partial data
+ */
+export async function discardChunkedUpload(upload: ChunkedUpload): Promise<void> {
+  uploads.delete(upload.id);
+  await fs.promises.unlink(upload.tempPath).catch(() => undefined);
+}
+
+// Periodically drop uploads that clients have abandoned
+setInterval(() => {
+  const cutoff = Date.now() - STALE_UPLOAD_TTL_MS;
+  for (const upload of Array.from(uploads.values())) {
+    if (upload.updatedAt < cutoff) {
+      console.log(`[Upload] Discarding stale chunked upload ${upload.id} (${upload.originalname})`);
+      discardChunkedUpload(upload);
+    }
+  }
+}, 60 * 60 * 1000).unref();
@@ -1,4 +1,5 @@
 // Load environment configuration for the application
+import path from 'path';
 
 // Helper to determine the appropriate domain based on environment
 // This is only a fallback - client should send their actual domain with each request
@@ -13,8 +14,20 @@ function getDomain(): string {
   return `http://localhost:${devPort}`;
 }
 
-// Export configuration object with all settings
-export const config = {
+// Recursively freeze the configuration so settings read once at startup can't drift at runtime
+function deepFreeze<T extends object>(value: T): Readonly<T> {
+  for (const child of Object.values(value)) {
+    if (child && typeof child === 'object') deepFreeze(child);
+  }
+  return Object.freeze(value);
+}
+
+// Development-only tooling (Vite dev server, query counting, response logging) requires an
+// explicit NODE_ENV=development, so a bundle started without NODE_ENV runs as production
+const environment = process.env.NODE_ENV || 'production';
+
+// Export configuration object with all settings, read from the environment once at startup
+export const config = deepFreeze({
   // Application domain for URLs in emails and absolute references
   appDomain: getDomain(),
   
@@ -24,13 +37,52 @@ export const config = {
   
   // Email configuration
   emailFrom: process.env.EMAIL_FROM || 'alerts@obedtv.com',
+  sendgridApiKey: process.env.SENDGRID_API_KEY || process.env.NEW_SENDGRID_API_KEY || '',
   sendgridSandbox: process.env.SENDGRID_SANDBOX === 'true',
   
   // Environment and database
-  environment: process.env.NODE_ENV || 'development',
-  isProduction: process.env.NODE_ENV === 'production',
+  environment,
+  isProduction: environment === 'production',
+  isDevelopment: environment === 'development',
   isDocker: process.env.IS_DOCKER === 'true',
   databaseUrl: process.env.DATABASE_URL,
+  version: process.env.npm_package_version || 'unknown',
+  database: {
+    // Connections in the single pool shared by queries and the session store
+    poolMax: parseInt(process.env.DB_POOL_MAX || '20', 10),
+    // Connections kept open even when idle, so bursts don't pay for new connections
+    poolMin: parseInt(process.env.DB_POOL_MIN || '2', 10),
+    connectionTimeoutMillis: parseInt(process.env.DB_CONNECTION_TIMEOUT_MS || '10000', 10),
+    idleTimeoutMillis: parseInt(process.env.DB_IDLE_TIMEOUT_MS || '30000', 10),
+    // Retire connections after this long so none outlive server-side or proxy timeouts
+    maxLifetimeSeconds: parseInt(process.env.DB_MAX_LIFETIME_SECONDS || '1800', 10)
+  },
+
+  // Internal nginx location that aliases the uploads directory (e.g. /protected-uploads/);
+  // when set, file content is served by nginx via X-Accel-Redirect instead of Node
+  accelRedirectPrefix: process.env.X_ACCEL_REDIRECT_PREFIX || '',
+
+  // Uploads
+  // Resolved once so every module shares the same absolute uploads path
+  uploadDir: path.resolve(process.env.UPLOAD_DIR || 'uploads'),
+  maxUploadSize: parseInt(process.env.MAX_UPLOAD_SIZE || '5368709120', 10), // 5GB default
+  // Largest JSON or form body buffered in memory; uploads are streamed and not bound by this
+  maxRequestBodySize: process.env.MAX_REQUEST_BODY_SIZE || '10mb',
+
+  // How long a logged-in user's record is reused across requests before it is reloaded (0 disables)
+  sessionUserCacheTtlMs: parseInt(process.env.SESSION_USER_CACHE_TTL_MS || '30000', 10),
+
+  // Development only: warn when a single API request issues more queries than this
+  queryCountWarnThreshold: parseInt(process.env.QUERY_COUNT_WARN_THRESHOLD || '10', 10),
+
+  // Background work started by requests
+  backgroundTasks: {
+    // ffmpeg jobs running at once; further uploads wait in the queue with status "pending"
+    videoProcessingConcurrency: parseInt(process.env.VIDEO_PROCESSING_CONCURRENCY || '2', 10),
+    // Notification emails sent at once, and how many may wait before new ones are dropped
+    notificationConcurrency: parseInt(process.env.NOTIFICATION_CONCURRENCY || '4', 10),
+    notificationMaxPending: parseInt(process.env.NOTIFICATION_MAX_PENDING || '1000', 10)
+  },
 
   // Video encoding configuration
   video: {
@@ -54,4 +106,12 @@ export const config = {
       disableAudio: process.env.VIDEO_SCRUB_DISABLE_AUDIO !== 'false' // Default to disable audio
     }
   }
-};
\ No newline at end of file
+});
+
+// Frozen copy of the environment taken at startup, for settings that are not part of `config`.
+// Each process.env access goes through a native getter; the snapshot is a plain object.
+const envSnapshot: Readonly<Record<string, string | undefined>> = Object.freeze({ ...process.env });
+
+export function getEnv(key: string, defaultValue?: string): string | undefined {
+  return envSnapshot[key] ?? defaultValue;
+}
@@ -1,6 +1,7 @@
 import * as fs from 'fs';
 import * as fsPromises from 'fs/promises';
 import path from 'path';
+import { config } from './config';
 
 // Interface for file details
 export interface FileDetails {
@@ -47,17 +48,27 @@ export async function getFileStats(filePath: string): Promise<any> {
  * Check if a file exists
  */
 export async function fileExists(filePath: string): Promise<boolean> {
-  console.log(`[DEBUG] Checking file existence for path: ${filePath}`);
   try {
     await fsPromises.access(filePath, fs.constants.F_OK);
-    console.log(`[DEBUG] File exists check success for: ${filePath}`);
     return true;
   } catch (error) {
-    console.log(`[DEBUG] File exists check failed for: ${filePath}`, error);
     return false;
   }
 }
 
+/**
+ * Stat a file in a single call, returning null if it does not exist
+ * (replaces an existence check followed by a separate stat)
+ */
+export async function statIfExists(filePath: string): Promise<fs.Stats | null> {
+  try {
+    return await fsPromises.stat(filePath);
+  } catch (error: any) {
+    if (error.code === 'ENOENT') return null;
+    throw error;
+  }
+}
+
 /**
  * Delete a file
  */
@@ -167,7 +178,7 @@ async function getFilesRecursively(dir: string): Promise<string[]> {
 // COMPREHENSIVE FILE DELETION UTILITIES
 // ========================================
 
-const UPLOADS_DIR = path.resolve(process.cwd(), 'uploads');
+const UPLOADS_DIR = config.uploadDir;
 const PROCESSED_DIR = path.resolve(UPLOADS_DIR, 'processed');
 
 /**
@@ -235,12 +246,16 @@ export async function removeProcessedDirectory(fileId: number): Promise<boolean>
 
 /**
  * Remove all files and processed versions for a file
+ * @param keepOriginal Leave the original upload in place (it is shared with other file records)
  */
-export async function removeFileCompletely(fileId: number, filePath: string): Promise<{ original: boolean; processed: boolean }> {
+export async function removeFileCompletely(fileId: number, filePath: string, keepOriginal = false): Promise<{ original: boolean; processed: boolean }> {
   console.log(`[FILESYSTEM] Complete removal for file ${fileId}`);
+  if (keepOriginal) {
+    console.log(`[FILESYSTEM] Keeping original file still used by other records: ${filePath}`);
+  }
   
   const [originalResult, processedResult] = await Promise.allSettled([
-    removeOriginalFile(filePath),
+    keepOriginal ? Promise.resolve(true) : removeOriginalFile(filePath),
     removeProcessedDirectory(fileId)
   ]);
   
@@ -254,7 +269,7 @@ export async function removeFileCompletely(fileId: number, filePath: string): Pr
  * Remove files for multiple file IDs with concurrency limit
  */
 export async function removeMultipleFiles(
-  files: Array<{ id: number; filePath: string }>, 
+  files: Array<{ id: number; filePath: string; keepOriginal?: boolean }>, 
   concurrencyLimit = 3
 ): Promise<Array<{ fileId: number; success: boolean; errors: string[] }>> {
   const results: Array<{ fileId: number; success: boolean; errors: string[] }> = [];
@@ -265,7 +280,7 @@ export async function removeMultipleFiles(
     
     const batchResults = await Promise.allSettled(
       batch.map(async (file) => {
-        const result = await removeFileCompletely(file.id, file.filePath);
+        const result = await removeFileCompletely(file.id, file.filePath, file.keepOriginal);
         const errors: string[] = [];
         
         if (!result.original) errors.push(`Failed to remove original file: ${file.filePath}`);
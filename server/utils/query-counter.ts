@@ -0,0 +1,48 @@
+import { AsyncLocalStorage } from 'async_hooks';
+import type { Request, Response, NextFunction } from 'express';
+import type { Logger } from 'drizzle-orm/logger';
+import { config } from './config';
+
+// Development-only guard against N+1 query regressions.
+// Every Drizzle query issued while handling a request is counted, and API
+// requests that exceed the configured threshold are reported loudly.
+
+interface QueryCounter {
+  count: number;
+}
+
+const requestQueries = new AsyncLocalStorage<QueryCounter>();
+
+/**
+ * Drizzle logger that counts the queries of the current request
+ */
+export const queryCountLogger: Logger = {
+  logQuery() {
+    const counter = requestQueries.getStore();
+    if (counter) {
+      counter.count++;
+    }
+  }
+};
+
+/**
+ * Express middleware that runs the request inside a query-counting context
+ */
+export function trackRequestQueries(req: Request, res: Response, next: NextFunction) {
+  if (!req.path.startsWith('/api')) {
+    return next();
+  }
+
+  const counter: QueryCounter = { count: 0 };
+
+  res.on('finish', () => {
+    if (counter.count > config.queryCountWarnThreshold) {
+      console.warn(
+        `⚠️ [QUERY COUNT] ${req.method} ${req.path} issued ${counter.count} database queries ` +
+        `(threshold ${config.queryCountWarnThreshold}) - possible N+1 query pattern`
+      );
+    }
+  });
+
+  requestQueries.run(counter, () => next());
+}
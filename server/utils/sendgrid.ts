@@ -16,14 +16,22 @@ if (!fs.existsSync(logDir)) {
 
 const logFilePath = path.join(logDir, 'sendgrid.log');
 
+// One append stream is opened on first use and shared by every log call, rather than
+// synchronously opening, writing and closing the file for each line
+let logStream: fs.WriteStream | null = null;
+
 function logToFile(message: string): void {
+  if (!logStream) {
+    logStream = fs.createWriteStream(logFilePath, { flags: 'a' });
+    logStream.on('error', (error) => console.error('Error writing SendGrid log:', error));
+  }
+
   const timestamp = new Date().toISOString();
-  const logMessage = `${timestamp} - ${message}\n`;
-  fs.appendFileSync(logFilePath, logMessage);
+  logStream.write(`${timestamp} - ${message}\n`);
 }
 
-// Get SendGrid API key from environment
-const apiKey = process.env.SENDGRID_API_KEY || process.env.NEW_SENDGRID_API_KEY;
+// SendGrid API key from the startup configuration
+const apiKey = config.sendgridApiKey;
 
 if (!apiKey) {
   const warning = "No SendGrid API key found. Email functionality will not work.";
@@ -33,12 +41,16 @@ if (!apiKey) {
   logToFile("SendGrid API key is set. Email functionality should be working.");
 }
 
-// Initialize the SendGrid mail service with API key
+// Initialize the SendGrid mail service with API key once; the client keeps it for every send
 const mailService = new MailService();
 mailService.setApiKey(apiKey || '');
 
+function recipientList(to: string | string[]): string {
+  return Array.isArray(to) ? to.join(', ') : to;
+}
+
 interface EmailParams {
-  to: string;
+  to: string | string[]; // A list is sent as one request, with each recipient getting an individual copy
   from: string;
   subject: string;
   text?: string;
@@ -54,7 +66,7 @@ export async function sendEmail(params: EmailParams): Promise<boolean> {
   try {
     // Log all input parameters for debugging
     logToFile(`Sending email with the following parameters:`);
-    logToFile(`  - To: ${params.to}`);
+    logToFile(`  - To: ${recipientList(params.to)}`);
     logToFile(`  - From: ${params.from}`);
     logToFile(`  - Subject: ${params.subject}`);
     logToFile(`  - Text length: ${params.text?.length || 0} characters`);
@@ -68,14 +80,6 @@ export async function sendEmail(params: EmailParams): Promise<boolean> {
       return false;
     }
     
-    // Log API key state (not the actual key for security)
-    const apiKeyLength = apiKey.length;
-    logToFile(`Using SendGrid API key (${apiKeyLength} characters)`);
-    
-    // Ensure the API key is properly set in the mail service
-    mailService.setApiKey(apiKey);
-    logToFile(`API key set in mail service`);
-    
     // Prepare email data with configurable sandbox mode
     // The account now has a verified sender (alerts@obedtv.com)
     const emailData = {
@@ -92,10 +96,11 @@ export async function sendEmail(params: EmailParams): Promise<boolean> {
     };
     
     logToFile(`Sending email via SendGrid...`);
-    const response = await mailService.send(emailData);
+    // Multiple recipients go out as one personalized request rather than one call per address
+    const response = await mailService.send(emailData, Array.isArray(params.to));
     
     // Log success and response details
-    const successMsg = `Email sent successfully to ${params.to}`;
+    const successMsg = `Email sent successfully to ${recipientList(params.to)}`;
     console.log(successMsg);
     logToFile(successMsg);
     
@@ -113,7 +118,7 @@ export async function sendEmail(params: EmailParams): Promise<boolean> {
     return true;
   } catch (error) {
     // Enhanced error logging
-    const errorMsg = `SendGrid email error when sending to ${params.to}: ${error instanceof Error ? error.message : String(error)}`;
+    const errorMsg = `SendGrid email error when sending to ${recipientList(params.to)}: ${error instanceof Error ? error.message : String(error)}`;
     console.error(errorMsg);
     logToFile(errorMsg);
     
@@ -176,7 +181,7 @@ export async function sendEmail(params: EmailParams): Promise<boolean> {
  */
 /**
  * Send approval status email for a file
- * @param to Recipient email
+ * @param to Recipient email, or a list of recipients notified in a single request
  * @param approverName Name of the person who approved/requested changes
  * @param projectName Name of the project
  * @param fileName Name of the file
@@ -187,7 +192,7 @@ export async function sendEmail(params: EmailParams): Promise<boolean> {
  * @returns Promise<boolean> Success status
  */
 export async function sendApprovalEmail(
-  to: string,
+  to: string | string[],
   approverName: string,
   projectName: string,
   fileName: string,
@@ -197,7 +202,7 @@ export async function sendApprovalEmail(
   projectId?: number
 ): Promise<boolean> {
   try {
-    logToFile(`Preparing approval email to ${to} for file "${fileName}" in project "${projectName}" from "${approverName}"`);
+    logToFile(`Preparing approval email to ${recipientList(to)} for file "${fileName}" in project "${projectName}" from "${approverName}"`);
     logToFile(`Status: ${status}, Feedback: ${feedback || 'None provided'}`);
     
     // Use the client-provided URL if available, otherwise fall back to config
@@ -290,7 +295,7 @@ export async function sendApprovalEmail(
       });
     }
   } catch (error) {
-    const errorMsg = `Error preparing approval email to ${to}: ${error instanceof Error ? error.message : String(error)}`;
+    const errorMsg = `Error preparing approval email to ${recipientList(to)}: ${error instanceof Error ? error.message : String(error)}`;
     console.error(errorMsg);
     logToFile(errorMsg);
     return false;
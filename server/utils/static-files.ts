@@ -0,0 +1,17 @@
+import path from 'path';
+import type { Response } from 'express';
+
+// Vite writes the client bundle's JS, CSS and media to assets/ with content hashes in the
+// filenames, so those can be cached by browsers indefinitely. Everything else (index.html,
+// favicon, manifest) must be revalidated so new deployments are picked up.
+const HASHED_ASSETS_SEGMENT = `${path.sep}assets${path.sep}`;
+
+export const staticFileOptions = {
+  setHeaders(res: Response, filePath: string) {
+    if (filePath.includes(HASHED_ASSETS_SEGMENT)) {
+      res.setHeader('Cache-Control', 'public, max-age=31536000, immutable');
+    } else {
+      res.setHeader('Cache-Control', 'no-cache');
+    }
+  }
+};
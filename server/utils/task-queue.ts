@@ -0,0 +1,60 @@
+import { config } from './config';
+
+/**
+ * In-process queue for background work started by requests (video processing, notification
+ * emails). Tasks run with bounded concurrency so a burst of requests cannot start an unbounded
+ * number of ffmpeg processes or SendGrid calls alongside request handling.
+ */
+export class TaskQueue {
+  private readonly pending: Array<{ label: string; run: () => Promise<unknown> }> = [];
+  private running = 0;
+
+  constructor(
+    private readonly name: string,
+    private readonly concurrency: number,
+    private readonly maxPending = Infinity
+  ) {}
+
+  /**
+   * Queue a task. Returns false (and drops the task) if the queue is full.
+   */
+  enqueue(label: string, run: () => Promise<unknown>): boolean {
+    if (this.pending.length >= this.maxPending) {
+      console.warn(`[${this.name}] Queue full (${this.pending.length} pending), dropping task: ${label}`);
+      return false;
+    }
+
+    this.pending.push({ label, run });
+    if (this.running >= this.concurrency) {
+      console.log(`[${this.name}] Queued ${label} (${this.pending.length} waiting)`);
+    }
+    this.drain();
+    return true;
+  }
+
+  get size(): { running: number; pending: number } {
+    return { running: this.running, pending: this.pending.length };
+  }
+
+  private drain() {
+    while (this.running < this.concurrency && this.pending.length > 0) {
+      const task = this.pending.shift()!;
+      this.running++;
+
+      task.run()
+        .catch((error) => console.error(`[${this.name}] Task failed: ${task.label}`, error))
+        .finally(() => {
+          this.running--;
+          this.drain();
+        });
+    }
+  }
+}
+
+// Shared queues for the server's background work
+export const videoProcessingQueue = new TaskQueue('Video Processing', config.backgroundTasks.videoProcessingConcurrency);
+export const notificationQueue = new TaskQueue(
+  'Notifications',
+  config.backgroundTasks.notificationConcurrency,
+  config.backgroundTasks.notificationMaxPending
+);
@@ -0,0 +1,187 @@
+import * as fs from 'fs';
+import path from 'path';
+import { createHash } from 'crypto';
+import { pipeline, Transform } from 'stream';
+import type { Request } from 'express';
+import type multer from 'multer';
+
+// Write buffer used when streaming uploads to disk. Large media uploads arrive in
+// small network chunks; a 1 MB buffer lets the write stream coalesce them into
+// fewer, larger writev() calls instead of one write() per chunk.
+export const UPLOAD_WRITE_BUFFER_SIZE = 1024 * 1024;
+
+interface LargeBufferDiskStorageOptions {
+  destination: string;
+  filename: (req: Request, file: Express.Multer.File) => string;
+  highWaterMark?: number;
+  // Store uploads under the SHA-256 of their content so identical uploads share one file on disk
+  deduplicate?: boolean;
+  // Whether any file record points at a stored path; required with `deduplicate` so a failed
+  // upload only removes a shared file that nothing else uses
+  isPathReferenced?: (filePath: string) => Promise<boolean>;
+}
+
+// Per-path locks serializing the "is this stored file still used" decision with the uploads
+// that reuse the same content-addressed file. The server runs as a single process, so an
+// in-memory lock covers every request that can touch the path.
+const pathLocks = new Map<string, Promise<void>>();
+
+// Stored files handed to uploads that have not yet created their file record
+const pendingClaims = new Map<string, number>();
+
+async function acquirePathLock(filePath: string): Promise<() => void> {
+  const previous = pathLocks.get(filePath) ?? Promise.resolve();
+  let release!: () => void;
+  const current = new Promise<void>((resolve) => { release = resolve; });
+  const tail = previous.then(() => current);
+  pathLocks.set(filePath, tail);
+  await previous;
+
+  return () => {
+    release();
+    if (pathLocks.get(filePath) === tail) pathLocks.delete(filePath);
+  };
+}
+
+/**
+ * Run `fn` while holding the locks of all given stored file paths (acquired in sorted order)
+ */
+export async function withPathLocks<T>(filePaths: string[], fn: () => Promise<T>): Promise<T> {
+  const releases: Array<() => void> = [];
+  try {
+    for (const filePath of Array.from(new Set(filePaths)).sort()) {
+      releases.push(await acquirePathLock(filePath));
+    }
+    return await fn();
+  } finally {
+    releases.reverse().forEach((release) => release());
+  }
+}
+
+/**
+ * Whether an upload in progress has been handed this stored file. Call while holding its lock.
+ */
+export function hasPendingClaim(filePath: string): boolean {
+  return (pendingClaims.get(filePath) ?? 0) > 0;
+}
+
+/**
+ * Release an upload's claim on a stored file once its file record was created (or failed to be).
+ * The file is removed if no other upload holds it and no file record points at it.
+ */
+export async function releaseStoredFile(
+  filePath: string,
+  isPathReferenced: (filePath: string) => Promise<boolean>
+): Promise<void> {
+  await withPathLocks([filePath], async () => {
+    const remaining = (pendingClaims.get(filePath) ?? 1) - 1;
+    if (remaining > 0) {
+      pendingClaims.set(filePath, remaining);
+      return;
+    }
+    pendingClaims.delete(filePath);
+
+    if (!(await isPathReferenced(filePath))) {
+      console.log(`[Upload] Removing stored file no longer used by any record: ${filePath}`);
+      await fs.promises.unlink(filePath).catch(() => undefined);
+    }
+  });
+}
+
+/**
+ * Content-addressed filename for an upload, keeping the extension of the original name
+ */
+export function contentAddressedFilename(sha256: string, originalFilename: string): string {
+  return sha256 + path.extname(originalFilename).toLowerCase();
+}
+
+/**
+ * Move a fully written upload to its content-addressed location. If a file with the same
+ * content is already stored there, the new copy is dropped and the existing one is reused.
+ * `created` tells whether this upload wrote the stored file. The caller holds a claim on the
+ * stored file until it calls releaseStoredFile(), so it cannot be deleted in between.
+ */
+export async function storeByContentHash(
+  tempPath: string,
+  destination: string,
+  filename: string
+): Promise<{ path: string; created: boolean }> {
+  const finalPath = path.join(destination, filename);
+  return withPathLocks([finalPath], async () => {
+    let created = false;
+    try {
+      await fs.promises.access(finalPath, fs.constants.F_OK);
+      await fs.promises.unlink(tempPath);
+      console.log(`[Upload] Duplicate content detected, reusing stored file ${finalPath}`);
+    } catch {
+      await fs.promises.rename(tempPath, finalPath);
+      created = true;
+    }
+
+    pendingClaims.set(finalPath, (pendingClaims.get(finalPath) ?? 0) + 1);
+    return { path: finalPath, created };
+  });
+}
+
+/**
+ * Multer storage engine that streams uploads straight to disk with a large write buffer
+ */
+export function largeBufferDiskStorage(options: LargeBufferDiskStorageOptions): multer.StorageEngine {
+  const highWaterMark = options.highWaterMark ?? UPLOAD_WRITE_BUFFER_SIZE;
+
+  return {
+    _handleFile(req, file, cb) {
+      const filename = options.filename(req, file);
+      const writePath = path.join(options.destination, filename);
+      const outStream = fs.createWriteStream(writePath, { highWaterMark });
+
+      // Hash the upload as it streams past so deduplication needs no second read
+      const hash = createHash('sha256');
+      const hashStream = new Transform({
+        transform(chunk, _encoding, callback) {
+          hash.update(chunk);
+          callback(null, chunk);
+        }
+      });
+
+      pipeline(file.stream, hashStream, outStream, (error) => {
+        if (error) {
+          // Don't leave partial uploads behind
+          fs.unlink(writePath, () => cb(error));
+          return;
+        }
+
+        const size = outStream.bytesWritten;
+        if (!options.deduplicate) {
+          cb(null, { destination: options.destination, filename, path: writePath, size });
+          return;
+        }
+
+        const storedFilename = contentAddressedFilename(hash.digest('hex'), file.originalname);
+        storeByContentHash(writePath, options.destination, storedFilename)
+          .then((stored) => cb(null, {
+            destination: options.destination,
+            filename: storedFilename,
+            path: stored.path,
+            size,
+            created: stored.created
+          } as Partial<Express.Multer.File>))
+          .catch((storeError) => fs.unlink(writePath, () => cb(storeError)));
+      });
+    },
+
+    _removeFile(_req, file, cb) {
+      // Deduplicated files may back other uploads or records; release this upload's claim and
+      // only remove the stored copy if nothing else uses it
+      if (options.deduplicate) {
+        if (!options.isPathReferenced) {
+          cb(null);
+          return;
+        }
+        releaseStoredFile(file.path, options.isPathReferenced).then(() => cb(null), cb);
+        return;
+      }
+      fs.unlink(file.path, (error) => cb(error));
+    }
+  };
+}
@@ -4,6 +4,9 @@ import fs from 'fs/promises';
 import { existsSync } from 'fs';
 import { config } from './utils/config.js';
 
+// Characters of ffmpeg's stderr kept for error reports
+const FFMPEG_STDERR_TAIL_LENGTH = 8192;
+
 export interface VideoProcessingOptions {
   inputPath: string;
   outputDir: string;
@@ -173,7 +176,9 @@ export class VideoProcessor {
    */
   private static executeFFmpeg(args: string[], timeoutMs: number = 300000): Promise<void> { // 5 minute default timeout
     return new Promise((resolve, reject) => {
-      const ffmpeg = spawn('ffmpeg', args, {
+      // ffmpeg writes a progress line to stderr several times a second; only errors are of
+      // interest here, so suppress the banner and progress stats at the source
+      const ffmpeg = spawn('ffmpeg', ['-hide_banner', '-nostats', ...args], {
         stdio: ['ignore', 'pipe', 'pipe']
       });
       
@@ -188,7 +193,8 @@ export class VideoProcessor {
       }, timeoutMs);
       
       ffmpeg.stderr.on('data', (data) => {
-        stderr += data.toString();
+        // Keep only the tail for error messages rather than buffering the whole run's output
+        stderr = (stderr + data.toString()).slice(-FFMPEG_STDERR_TAIL_LENGTH);
       });
       
       ffmpeg.on('close', (code) => {
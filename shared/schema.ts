@@ -1,4 +1,5 @@
-import { pgTable, text, serial, integer, bigint, boolean, timestamp, json, uuid } from "drizzle-orm/pg-core";
+import { pgTable, text, serial, integer, bigint, boolean, timestamp, json, uuid, uniqueIndex } from "drizzle-orm/pg-core";
+import { relations } from "drizzle-orm";
 import { createInsertSchema } from "drizzle-zod";
 import { z } from "zod";
 
@@ -188,7 +189,10 @@ export const approvals = pgTable("approvals", {
   status: text("status").notNull(), // "approved", "requested_changes"
   feedback: text("feedback"),
   createdAt: timestamp("created_at").notNull().defaultNow(),
-});
+}, (table) => [
+  // One approval per user and file; approvals are upserted with ON CONFLICT on these columns
+  uniqueIndex("idx_approvals_file_user_unique").on(table.fileId, table.userId),
+]);
 
 export const insertApprovalSchema = createInsertSchema(approvals)
   .omit({ id: true, createdAt: true });
@@ -241,9 +245,38 @@ export const insertCommentReactionSchema = createInsertSchema(commentReactions)
     reactionType: z.enum(["👍", "❤️", "👏", "🎉", "😮", "😢", "😡"]),
   });
 
+// RELATIONS (used by relational queries to load related rows in a single statement)
+export const projectsRelations = relations(projects, ({ many }) => ({
+  files: many(files),
+  members: many(projectUsers),
+}));
+
+export const filesRelations = relations(files, ({ one, many }) => ({
+  project: one(projects, { fields: [files.projectId], references: [projects.id] }),
+  uploadedBy: one(users, { fields: [files.uploadedById], references: [users.id] }),
+  unifiedComments: many(commentsUnified),
+  approvals: many(approvals),
+}));
+
+export const commentsUnifiedRelations = relations(commentsUnified, ({ one }) => ({
+  file: one(files, { fields: [commentsUnified.fileId], references: [files.id] }),
+  author: one(users, { fields: [commentsUnified.userId], references: [users.id] }),
+}));
+
+export const projectUsersRelations = relations(projectUsers, ({ one }) => ({
+  project: one(projects, { fields: [projectUsers.projectId], references: [projects.id] }),
+  user: one(users, { fields: [projectUsers.userId], references: [users.id] }),
+}));
+
+export const approvalsRelations = relations(approvals, ({ one }) => ({
+  file: one(files, { fields: [approvals.fileId], references: [files.id] }),
+  reviewer: one(users, { fields: [approvals.userId], references: [users.id] }),
+}));
+
 // Type definitions
 export type User = typeof users.$inferSelect;
 export type InsertUser = z.infer<typeof insertUserSchema>;
+export type SafeUser = Omit<User, "password">; // User without the password hash, safe to return from the API
 
 export type Folder = typeof folders.$inferSelect;
 export type InsertFolder = z.infer<typeof insertFolderSchema>;
@@ -266,6 +299,11 @@ export type InsertPublicComment = z.infer<typeof insertPublicCommentSchema>;
 export type CommentUnified = typeof commentsUnified.$inferSelect;
 export type InsertCommentUnified = z.infer<typeof insertCommentsUnifiedSchema>;
 
+// Unified comment together with the file it belongs to (project-wide comment listings)
+export type ProjectComment = CommentUnified & {
+  file: Pick<File, "id" | "filename" | "fileType">;
+};
+
 // Unified comment type for merging authenticated and public comments (LEGACY - to be replaced)
 export type UnifiedComment = {
   id: number;